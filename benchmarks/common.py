@@ -0,0 +1,83 @@
+import collections
+import os
+import statistics
+import time
+
+import gym
+import numpy as np
+import torch
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the spaces of the envs the scripts train on, without the simulators
+PROCGEN_OBSERVATION_SPACE = gym.spaces.Box(0, 255, (64, 64, 3), np.uint8)
+PROCGEN_ACTION_SPACE = gym.spaces.Discrete(15)
+DMC_OBSERVATION_SPACE = gym.spaces.Box(-np.inf, np.inf, (24,), np.float32)  # walker-walk
+DMC_ACTION_SPACE = gym.spaces.Box(-1.0, 1.0, (6,), np.float32)
+
+# name: "<group>/<case>"; fn: the timed callable; samples: observations
+# processed per call, for the throughput; params: the sizes it ran with;
+# close: called once the case is done with, if not None; setup: if not None,
+# called before every call, untimed, and its result passed to fn
+Case = collections.namedtuple("Case", ["name", "fn", "samples", "params", "close", "setup"], defaults=[None, None])
+
+
+class FakeVectorEnv(gym.vector.VectorEnv):
+    """Vector env with the spaces of a real one and no simulator.
+
+    Observations come from a pool of pool_size random batches sampled once,
+    rewards are random and env i finishes an episode every episode_length
+    steps, offset by i, so the rollout code sees realistic dones and infos.
+    """
+    def __init__(self, num_envs, observation_space, action_space, episode_length=500, pool_size=8, seed=0):
+        super(FakeVectorEnv, self).__init__(num_envs, observation_space, action_space)
+        self.observation_space.seed(seed)
+        self._pool = [self.observation_space.sample() for _ in range(pool_size)]
+        self._rng = np.random.default_rng(seed)
+        self._t = np.arange(num_envs)
+        self.episode_length = episode_length
+
+    def reset_wait(self, timeout=None, seed=None, return_info=False, options=None):
+        self._t = np.arange(self.num_envs)
+        return self._pool[0]
+
+    def step_async(self, actions):
+        self._actions = actions
+
+    def step_wait(self, timeout=None):
+        self._t += 1
+        dones = self._t % self.episode_length == 0
+        rewards = self._rng.random(self.num_envs)
+        observations = self._pool[self._t[0] % len(self._pool)]
+        return observations, rewards, dones, [{} for _ in range(self.num_envs)]
+
+
+def measure(fn, repeats=10, warmup=2, device="cpu", setup=None):
+    # wall-clock time of fn() in milliseconds, waiting for queued CUDA work;
+    # with setup, of fn(setup()) without the time of setup()
+    if torch.device(device).type == "cuda":
+        sync = torch.cuda.synchronize
+    else:
+        def sync():
+            pass
+    def inputs():
+        return () if setup is None else (setup(),)
+
+    for _ in range(warmup):
+        fn(*inputs())
+    sync()
+    times = []
+    for _ in range(repeats):
+        args = inputs()
+        sync()
+        start = time.perf_counter()
+        fn(*args)
+        sync()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return {
+        "median_ms": statistics.median(times),
+        "mean_ms": statistics.mean(times),
+        "min_ms": min(times),
+        "std_ms": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "repeats": repeats,
+    }
@@ -0,0 +1,42 @@
+"""Compares two results files of benchmarks.run, case by case.
+
+    python -m benchmarks.compare before.json after.json
+
+speedup is the median time of before divided by the one of after.
+"""
+import argparse
+import json
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("before", type=str,
+        help="the results of the baseline")
+    parser.add_argument("after", type=str,
+        help="the results to compare with the baseline")
+    return parser.parse_args()
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    return data["environment"], {result["name"]: result for result in data["results"]}
+
+
+def main():
+    args = parse_args()
+    before_environment, before = load(args.before)
+    after_environment, after = load(args.after)
+    print(f"before: {before_environment['commit']}  after: {after_environment['commit']}")
+    for name in [name for name in before if name in after]:
+        if before[name]["params"] != after[name]["params"]:
+            print(f"{name:50s} different params, skipped")
+            continue
+        speedup = before[name]["median_ms"] / after[name]["median_ms"]
+        print(f"{name:50s} {before[name]['median_ms']:10.3f} ms -> {after[name]['median_ms']:10.3f} ms  x{speedup:.2f}")
+    for name in sorted(set(before) ^ set(after)):
+        print(f"{name:50s} only in {args.before if name in before else args.after}")
+
+
+if __name__ == "__main__":
+    main()
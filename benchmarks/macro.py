@@ -0,0 +1,68 @@
+import argparse
+
+import torch
+import torch.optim as optim
+
+from benchmarks.common import (DMC_ACTION_SPACE, DMC_OBSERVATION_SPACE, PROCGEN_ACTION_SPACE,
+                               PROCGEN_OBSERVATION_SPACE, Case, FakeVectorEnv)
+from engine.agents import ImpalaAgent, MLPAgent
+from engine.hooks import Hook
+from engine.learner import PPOLearner
+from engine.pipeline import Pipeline
+from engine.rollout import RolloutEngine
+from timers import PhaseTimer
+
+
+def update_case(name, agent_class, observation_space, action_space, obs_dtype, num_envs, num_steps,
+                num_minibatches, update_epochs, iterations, device, pipeline=False):
+    # iterations of the training loop of engine.train: rollout, GAE and the PPO update,
+    # with pipeline the update of the previous iteration overlapping the rollout as in --pipeline
+    envs = FakeVectorEnv(num_envs, observation_space, action_space)
+    args = argparse.Namespace(num_envs=num_envs, num_steps=num_steps, batch_size=num_envs * num_steps,
+                              minibatch_size=num_envs * num_steps // num_minibatches, update_epochs=update_epochs,
+                              learning_rate=5e-4, anneal_lr=False, gae=True, gamma=0.999, gae_lambda=0.95,
+                              norm_adv=True, clip_coef=0.2, clip_vloss=True, ent_coef=0.01, vf_coef=0.5,
+                              max_grad_norm=0.5, target_kl=None)
+    agent = agent_class(envs).to(device)
+    optimizer = optim.Adam(agent.parameters(), lr=args.learning_rate, eps=1e-5)
+    timer = PhaseTimer()
+    hook = Hook()
+    hook.setup(args, None, device, timer)
+    rollout = RolloutEngine(args, envs, obs_dtype, device, hook, timer)
+    learner = PPOLearner(args, agent, optimizer, 1, hook, lambda name, value, global_step: None, timer)
+    pipe = None
+
+    def update():
+        for _ in range(iterations):
+            rollout.collect(agent)
+            learner.learn(1, 0, *rollout.batch(*rollout.advantages(agent)))
+
+    if pipeline:
+        pipe = Pipeline(agent, learner.learn, device)
+
+        def update():
+            # the last update is waited for inside the call, so it is timed and
+            # a call covers as many updates as in the serial case
+            with torch.cuda.stream(pipe.stream):
+                for _ in range(iterations):
+                    rollout.collect(pipe.policy)
+                    pipe.submit(1, 0, rollout.batch(*rollout.advantages(pipe.policy)))
+                pipe.wait()
+
+    params = {"num_envs": num_envs, "num_steps": num_steps, "num_minibatches": num_minibatches,
+              "update_epochs": update_epochs, "iterations": iterations}
+    return Case(name, update, iterations * args.batch_size, params, None if pipe is None else pipe.close)
+
+
+def cases(config):
+    device = torch.device(config.device)
+    yield update_case("update/procgen_impala_cnn", ImpalaAgent, PROCGEN_OBSERVATION_SPACE, PROCGEN_ACTION_SPACE,
+                      torch.uint8, config.procgen_num_envs, config.procgen_num_steps, config.procgen_num_minibatches,
+                      config.procgen_update_epochs, config.macro_iterations, device)
+    yield update_case("update/procgen_impala_cnn_pipelined", ImpalaAgent, PROCGEN_OBSERVATION_SPACE,
+                      PROCGEN_ACTION_SPACE, torch.uint8, config.procgen_num_envs, config.procgen_num_steps,
+                      config.procgen_num_minibatches, config.procgen_update_epochs, config.macro_iterations, device,
+                      pipeline=True)
+    yield update_case("update/dmc_mlp", MLPAgent, DMC_OBSERVATION_SPACE, DMC_ACTION_SPACE, torch.float32,
+                      config.dmc_num_envs, config.dmc_num_steps, config.dmc_num_minibatches,
+                      config.dmc_update_epochs, config.macro_iterations, device)
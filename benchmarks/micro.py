@@ -0,0 +1,113 @@
+import argparse
+
+import numpy as np
+import torch
+
+import data_augs_procgen
+import data_augs_procgen_torch
+from benchmarks.common import (DMC_ACTION_SPACE, DMC_OBSERVATION_SPACE, PROCGEN_ACTION_SPACE,
+                               PROCGEN_OBSERVATION_SPACE, Case, FakeVectorEnv)
+from engine.agents import ImpalaAgent, MLPAgent
+from engine.envs import convert_obs
+from gae import compute_advantages
+
+# The NumPy augmentations that convert_obs used before the torch pipeline
+NUMPY_AUGMENTATIONS = ["Cutout", "Cutout_Color", "Rand_Crop", "Center_Crop", "RandGray", "Rand_Flip", "Rand_Rotate",
+                       "ColorJitterLayer"]
+
+
+def procgen_batch(batch_size, device):
+    return torch.randint(0, 256, (batch_size,) + PROCGEN_OBSERVATION_SPACE.shape, dtype=torch.uint8, device=device)
+
+
+def augmentation_cases(config):
+    device = torch.device(config.device)
+    n = config.procgen_num_envs
+    params = {"batch_size": n}
+    images = procgen_batch(n, "cpu").numpy()
+    for aug_type in NUMPY_AUGMENTATIONS:
+        # some of them augment the images in place, so every call gets a copy
+        def augment(images, aug=getattr(data_augs_procgen, aug_type)(batch_size=n)):
+            aug.change_randomization_params_all()
+            return aug.do_augmentation(images)
+        yield Case(f"augment/numpy/{aug_type}", augment, n, params, setup=images.copy)
+
+    obs = procgen_batch(n, device)
+    for aug_type in data_augs_procgen_torch.augmentations:
+        yield Case(f"augment/torch/{aug_type}", lambda pipeline=data_augs_procgen_torch.AugmentationPipeline(
+            aug_type, device): pipeline(obs), n, params)
+
+
+def convert_obs_cases(config):
+    device = torch.device(config.device)
+    n = config.procgen_num_envs
+    obs = procgen_batch(n, device)
+
+    # the device -> NumPy -> device round trip of the original convert_obs,
+    # with a new augmentation object per call
+    def numpy_round_trip():
+        rand_aug = data_augs_procgen.Cutout_Color(batch_size=obs.shape[0])
+        return torch.as_tensor(rand_aug.do_augmentation(obs.cpu().numpy()), dtype=torch.float32).to(device)
+    yield Case("convert_obs/procgen/numpy", numpy_round_trip, n, {"batch_size": n, "aug": "Cutout_Color"})
+
+    pipeline = data_augs_procgen_torch.AugmentationPipeline("Cutout_Color", device)
+    yield Case("convert_obs/procgen/torch", lambda: pipeline(obs), n, {"batch_size": n, "aug": "Cutout_Color"})
+
+    m = config.dmc_num_steps
+    dmc_obs = torch.randn((m,) + DMC_OBSERVATION_SPACE.shape, device=device)
+    for aug in ["gaussian_add", "uniform_mul"]:
+        args = argparse.Namespace(aug=aug, uniform_mul_r1=0.6, uniform_mul_r2=1.2)
+        yield Case(f"convert_obs/dmc/{aug}", lambda args=args: convert_obs(dmc_obs, args), m,
+                   {"batch_size": m, "aug": aug})
+
+
+def gae_cases(config):
+    device = torch.device(config.device)
+    num_steps, num_envs = config.procgen_num_steps, config.procgen_num_envs
+    params = {"num_steps": num_steps, "num_envs": num_envs}
+    rewards = torch.rand(num_steps, num_envs, device=device)
+    dones = (torch.rand(num_steps, num_envs, device=device) < 0.01).float()
+    next_done = torch.zeros(num_envs, device=device)
+    # BAE: the original and one augmented value stream
+    for name, streams in [("single", 1), ("bae_dual", 2)]:
+        values = torch.randn((streams, num_steps, num_envs) if streams > 1 else (num_steps, num_envs), device=device)
+        next_value = torch.randn(streams, num_envs, device=device)
+        yield Case(f"gae/torch/{name}", lambda values=values, next_value=next_value: compute_advantages(
+            rewards, values, dones, next_value, next_done, 0.999, 0.95), num_steps * num_envs, params)
+        arrays = [t.cpu().numpy() for t in (rewards, values, dones, next_value, next_done)]
+        yield Case(f"gae/numpy/{name}", lambda arrays=arrays: compute_advantages(*arrays, 0.999, 0.95),
+                   num_steps * num_envs, params)
+
+
+def agent_cases(config):
+    device = torch.device(config.device)
+    agents = [
+        ("impala_cnn", ImpalaAgent, PROCGEN_OBSERVATION_SPACE, PROCGEN_ACTION_SPACE,
+         [config.procgen_num_envs, config.procgen_minibatch_size]),
+        ("mlp", MLPAgent, DMC_OBSERVATION_SPACE, DMC_ACTION_SPACE, [config.dmc_num_envs, config.dmc_minibatch_size]),
+    ]
+    for name, agent_class, observation_space, action_space, batch_sizes in agents:
+        agent = agent_class(FakeVectorEnv(1, observation_space, action_space)).to(device)
+        for batch_size in batch_sizes:
+            params = {"batch_size": batch_size}
+            if observation_space.dtype == np.uint8:
+                x = procgen_batch(batch_size, device)
+            else:
+                x = torch.randn((batch_size,) + observation_space.shape, device=device)
+
+            def inference(x=x):
+                with torch.no_grad():
+                    return agent.get_action_and_value(x)
+            yield Case(f"agent/{name}/inference_{batch_size}", inference, batch_size, params)
+
+            def forward_backward(x=x):
+                _, logprob, entropy, value = agent.get_action_and_value(x)
+                (value.mean() - logprob.mean() - entropy.mean()).backward()
+            yield Case(f"agent/{name}/forward_backward_{batch_size}", forward_backward, batch_size, params)
+
+
+def cases(config):
+    yield from augmentation_cases(config)
+    yield from convert_obs_cases(config)
+    yield from gae_cases(config)
+    yield from agent_cases(config)
@@ -0,0 +1,127 @@
+"""Times the training hot paths on synthetic data and writes the results to JSON.
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.compare before.json after.json
+
+Needs neither Procgen nor DMC: the observations are random batches with the
+spaces of the real envs. --filter takes fnmatch patterns over the case
+names, e.g. "augment/torch/*" or "gae/*".
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import torch
+
+from benchmarks import macro, micro
+from benchmarks.common import REPO_DIR, measure
+
+SUITES = {"micro": micro, "macro": macro}
+
+
+def parse_args():
+    # fmt: off
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--suite", type=str, nargs="+", default=["micro", "macro"], choices=list(SUITES),
+        help="the benchmark suites to run")
+    parser.add_argument("--filter", type=str, nargs="+", default=["*"],
+        help="fnmatch patterns of the cases to run")
+    parser.add_argument("--output", type=str, default=None,
+        help="the JSON file the results are written to")
+    parser.add_argument("--device", type=str, default="cpu",
+        help="the torch device the benchmarks run on")
+    parser.add_argument("--repeats", type=int, default=20,
+        help="the number of timed calls of a micro benchmark")
+    parser.add_argument("--macro-repeats", type=int, default=3,
+        help="the number of timed calls of a macro benchmark")
+    parser.add_argument("--macro-iterations", type=int, default=2,
+        help="the number of training iterations per timed call of a macro benchmark")
+    parser.add_argument("--warmup", type=int, default=2,
+        help="the number of untimed calls before timing")
+    parser.add_argument("--seed", type=int, default=1,
+        help="seed of the synthetic data")
+    parser.add_argument("--num-threads", type=int, default=None,
+        help="torch.set_num_threads, if given")
+    parser.add_argument("--procgen-num-envs", type=int, default=64,
+        help="num-envs of the Procgen cases")
+    parser.add_argument("--procgen-num-steps", type=int, default=32,
+        help="num-steps of the Procgen cases (256 in the scripts)")
+    parser.add_argument("--procgen-num-minibatches", type=int, default=8,
+        help="num-minibatches of the Procgen update")
+    parser.add_argument("--procgen-update-epochs", type=int, default=3,
+        help="update-epochs of the Procgen update")
+    parser.add_argument("--dmc-num-envs", type=int, default=1,
+        help="num-envs of the DMC/PyBullet cases")
+    parser.add_argument("--dmc-num-steps", type=int, default=2048,
+        help="num-steps of the DMC/PyBullet cases")
+    parser.add_argument("--dmc-num-minibatches", type=int, default=32,
+        help="num-minibatches of the DMC/PyBullet update")
+    parser.add_argument("--dmc-update-epochs", type=int, default=10,
+        help="update-epochs of the DMC/PyBullet update")
+    args = parser.parse_args()
+    args.procgen_minibatch_size = args.procgen_num_envs * args.procgen_num_steps // args.procgen_num_minibatches
+    args.dmc_minibatch_size = args.dmc_num_envs * args.dmc_num_steps // args.dmc_num_minibatches
+    # fmt: on
+    return args
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(args):
+    return {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "num_threads": torch.get_num_threads(),
+        "device": args.device,
+        "cuda_device": torch.cuda.get_device_name(args.device) if torch.device(args.device).type == "cuda" else None,
+    }
+
+
+def main():
+    args = parse_args()
+    if args.num_threads:
+        torch.set_num_threads(args.num_threads)
+    np.random.seed(args.seed)
+    torch.manual_seed(args.seed)
+
+    results = []
+    for suite in args.suite:
+        repeats = args.macro_repeats if suite == "macro" else args.repeats
+        for case in SUITES[suite].cases(args):
+            try:
+                if not any(fnmatch.fnmatch(case.name, pattern) for pattern in args.filter):
+                    continue
+                timing = measure(case.fn, repeats, args.warmup, args.device, case.setup)
+            finally:
+                if case.close is not None:
+                    case.close()
+            timing["samples_per_s"] = case.samples / timing["median_ms"] * 1000.0
+            results.append(dict(name=case.name, suite=suite, params=case.params, **timing))
+            print(f"{case.name:50s} {timing['median_ms']:10.3f} ms {timing['samples_per_s']:14.1f} samples/s")
+            sys.stdout.flush()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(args), "config": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# Makes the modules of the repository root importable from tests/.
@@ -2,13 +2,65 @@ import numpy as np
 import matplotlib.pyplot as plt
 import torch
 import torch.nn as nn
+import functools
 import numbers
 import random
 import time
 
-from skimage.util.shape import view_as_windows
-from skimage.transform import resize
-from skimage.transform import rescale
+def linear_resize_table(in_size, out_size):
+    # source indices and weights of a 1-d linear resize with half-pixel centers
+    # and mirrored borders, i.e. what skimage's resize(order=1) does
+    src = (np.arange(out_size) + 0.5) * in_size / out_size - 0.5
+    src = np.abs(src)
+    src = np.where(src > in_size - 1, 2 * (in_size - 1) - src, src)
+    idx0 = np.floor(src).astype(np.int64)
+    idx1 = np.minimum(idx0 + 1, in_size - 1)
+    weight = (src - idx0).astype(np.float32)
+    return idx0, idx1, weight
+
+@functools.lru_cache(maxsize=16)
+def crop_resize_tables(in_size, scale_size, crop_size, crop_max):
+    # crop_max x crop_size tables: row o holds the source indices and weights
+    # of the crop starting at offset o of an image resized from in_size to
+    # scale_size. The bilinear resample is separable, so the tables of both
+    # axes cover every (h1, w1) crop pair and a batch only indexes into them.
+    idx0, idx1, weight = linear_resize_table(in_size, scale_size)
+    windows = np.arange(crop_max)[:, None] + np.arange(crop_size)
+    tables = idx0[windows], idx1[windows], weight[windows]
+    for table in tables:
+        table.setflags(write=False)
+    return tables
+
+def _box_index(h1, w1, pivot_h, pivot_w, h, w):
+    # flat pixel indices of the box [pivot_h+h1, pivot_h+2*h1) x [pivot_w+w1, pivot_w+2*w1)
+    # of every image, from an n x s x s mask over the largest possible box,
+    # together with the number of box pixels of each image
+    n = len(h1)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    span = np.arange(max(h1.max(), w1.max()))
+    rows = pivot_h + h1[:, None] + span
+    cols = pivot_w + w1[:, None] + span
+    in_rows = (span < h1[:, None]) & (rows < h)
+    in_cols = (span < w1[:, None]) & (cols < w)
+    mask = in_rows[:, :, None] & in_cols[:, None, :]
+    pixels = (np.arange(n)[:, None, None] * h + rows[:, :, None]) * w + cols[:, None, :]
+    return pixels[mask], mask.sum(axis=(1, 2))
+
+def _output_buffer(imgs, out, inplace):
+    # out=None allocates, inplace=True writes into imgs, otherwise fills out;
+    # out is checked before anything is written into it
+    if inplace:
+        out = imgs
+    elif out is None:
+        return imgs.copy()
+    elif out.shape != imgs.shape or out.dtype != imgs.dtype:
+        raise ValueError("the output array must have the shape and dtype of the images")
+    if not out.flags['C_CONTIGUOUS']:
+        raise ValueError("the output array must be C-contiguous")
+    if out is not imgs:
+        np.copyto(out, imgs)
+    return out
 
 class RandGray(object):
     def __init__(self,  
@@ -69,14 +121,11 @@ class Cutout(object):
         self.w1 = np.random.randint(self.box_min, self.box_max, batch_size)
         self.h1 = np.random.randint(self.box_min, self.box_max, batch_size)
         
-    def do_augmentation(self, imgs):
+    def do_augmentation(self, imgs, out=None, inplace=False):
         n, h, w, c = imgs.shape
-        cutouts = np.empty((n, h, w, c), dtype=imgs.dtype)
-        for i, (img, w11, h11) in enumerate(zip(imgs, self.w1, self.h1)):
-            cut_img = img.copy()
-            cut_img[self.pivot_h+h11:self.pivot_h+h11+h11, 
-                    self.pivot_w+w11:self.pivot_w+w11+w11, :] = 0
-            cutouts[i] = cut_img
+        cutouts = _output_buffer(imgs, out, inplace)
+        pixels, _ = _box_index(self.h1[:n], self.w1[:n], self.pivot_h, self.pivot_w, h, w)
+        cutouts.reshape(-1, c)[pixels] = 0
         return cutouts
     
     def change_randomization_params(self, index_):
@@ -113,18 +162,11 @@ class Cutout_Color(object):
         self.rand_box = np.random.randint(0, 255, size=(batch_size, 1, 1, 3), dtype=obs_dtype)
         self.obs_dtype = obs_dtype
         
-    def do_augmentation(self, imgs):
+    def do_augmentation(self, imgs, out=None, inplace=False):
         n, h, w, c = imgs.shape
-        pivot_h = 12
-        pivot_w = 24
-
-        cutouts = np.empty((n, h, w, c), dtype=imgs.dtype)
-        for i, (img, w11, h11) in enumerate(zip(imgs, self.w1, self.h1)):
-            cut_img = img.copy()
-            cut_img[self.pivot_h+h11:self.pivot_h+h11+h11, self.pivot_w+w11:self.pivot_w+w11+w11, :] \
-            = np.tile(self.rand_box[i], cut_img[self.pivot_h+h11:self.pivot_h+h11+h11, 
-                                                self.pivot_w+w11:self.pivot_w+w11+w11, :].shape[:-1] +(1,))
-            cutouts[i] = cut_img
+        cutouts = _output_buffer(imgs, out, inplace)
+        pixels, counts = _box_index(self.h1[:n], self.w1[:n], self.pivot_h, self.pivot_w, h, w)
+        cutouts.reshape(-1, c)[pixels] = np.repeat(self.rand_box[:n, 0, 0], counts, axis=0)
         return cutouts
         
     def change_randomization_params(self, index_):
@@ -205,45 +247,28 @@ class Rand_Crop(object):
         
         self.batch_size = batch_size
         self.crop_size = 64
+        self.scale_size = 84
         self.crop_max = 75 - self.crop_size
         self.w1 = np.random.randint(0, self.crop_max, self.batch_size)
         self.h1 = np.random.randint(0, self.crop_max, self.batch_size)
                 
     def do_augmentation(self, imgs):
-        # procgen give 64x64, thus first scale-up to 84, then crop back to 64
-        # print('imgs before transpose', imgs.shape)
-        n = imgs.shape[0]
-        imgs_in = imgs
-        imgs_out = np.zeros((n, 84, 84, 3))
-
-        for m,i in enumerate(imgs_in):
-            imgs_out[m,:,:,:] = resize(imgs_in[m,:,:,:], imgs_out.shape[1:], anti_aliasing=True)
-        imgs = imgs_out
-
+        # procgen give 64x64, thus first scale-up to 84, then crop back to 64.
+        # Only the cropped pixels of the upscaled images are interpolated: the
+        # crop offsets select rows of the cached resize tables, and each axis
+        # is one gather over the whole batch in float32.
+        n, h, w, c = imgs.shape
 
-        # imgs = rescale(imgs, 1.32)
-        # print('imgs after resize', imgs.shape)
+        rows0, rows1, weights = crop_resize_tables(h, self.scale_size, self.crop_size, self.crop_max)
+        weights = weights[self.h1][:, :, None, None]
+        imgs = (np.take_along_axis(imgs, rows0[self.h1][:, :, None, None], axis=1) * (1 - weights)
+                + np.take_along_axis(imgs, rows1[self.h1][:, :, None, None], axis=1) * weights)
 
-        # batch size
-       
-
-        img_size = imgs.shape[1]
-        imgs = np.transpose(imgs, (0, 2, 1, 3))
-        # print('imgs.shape after transpose', imgs.shape)
-        # creates all sliding windows combinations of size (output_size)
-        # windows = view_as_windows(
-        #     imgs, (1, self.crop_size, self.crop_size, 1))[..., 0,:,:, 0]
-        windows = view_as_windows(imgs, (1, self.crop_size, self.crop_size, 1))
-        # print('windows type', type(windows))
-        # print('windows shape', windows.shape)
-        windows = windows[..., 0,:,:, 0]
-        # print('after index windows type', type(windows))
-        # print('after index windows shape', windows.shape)
-        
-        # selects a random window for each batch element
-        cropped_imgs = windows[np.arange(n), self.w1, self.h1]
-        cropped_imgs = np.swapaxes(cropped_imgs,1,3)
-        return cropped_imgs
+        cols0, cols1, weights = crop_resize_tables(w, self.scale_size, self.crop_size, self.crop_max)
+        weights = weights[self.w1][:, None, :, None]
+        imgs = (np.take_along_axis(imgs, cols0[self.w1][:, None, :, None], axis=2) * (1 - weights)
+                + np.take_along_axis(imgs, cols1[self.w1][:, None, :, None], axis=2) * weights)
+        return imgs.astype(np.float32, copy=False)
     
     def change_randomization_params(self, index_):
         self.w1[index_] = np.random.randint(0, self.crop_max)
@@ -290,6 +315,7 @@ class ColorJitterLayer(nn.Module):
                  hue=0.5,
                  p_rand=1.0,
                  stack_size=1, 
+                 device=None,
                  *_args,
                  **_kwargs):
         super(ColorJitterLayer, self).__init__()
@@ -302,7 +328,9 @@ class ColorJitterLayer(nn.Module):
         self.prob = p_rand
         self.batch_size = batch_size
         self.stack_size = stack_size
-        self._device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        if device is None:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self._device = torch.device(device)
 #         self._device = torch.device('cpu')
     
         # random paramters
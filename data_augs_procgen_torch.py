@@ -0,0 +1,428 @@
+import functools
+
+import numpy as np
+import torch
+
+import data_augs_procgen
+
+# Torch counterparts of the augmentations in data_augs_procgen. They take a
+# b x h x w x c tensor with values in [0, 255] on any device, keep their random
+# parameters on that device and process the whole batch without Python loops.
+# Given the same random parameters they produce the same images as the NumPy
+# versions, so the two can be swapped in convert_obs.
+# do_augmentation writes into out when it is given, and
+# change_randomization_params_all redraws the parameters in place, so an
+# object can be reused across steps (see AugmentationPipeline).
+
+
+def _fill_boxes(out, h1, w1, pivot_h, pivot_w, box_max, values):
+    # writes values (0 or b x c) into the box [pivot+h1, pivot+2*h1) x [pivot+w1, pivot+2*w1)
+    # of every image of out, in place
+    if out.device.type == 'cpu':
+        return _fill_boxes_index(out, h1, w1, pivot_h, pivot_w, values)
+    return _fill_boxes_window(out, h1, w1, pivot_h, pivot_w, box_max, values)
+
+
+def _fill_boxes_index(out, h1, w1, pivot_h, pivot_w, values):
+    # on the CPU: the flat pixel indices of data_augs_procgen, on views of the same memory
+    n, h, w, c = out.shape
+    pixels, counts = data_augs_procgen._box_index(h1.numpy(), w1.numpy(), pivot_h, pivot_w, h, w)
+    if torch.is_tensor(values):
+        values = values.repeat_interleave(torch.from_numpy(counts), 0)
+    out.view(-1, c)[torch.from_numpy(pixels)] = values
+    return out
+
+
+def _fill_boxes_window(out, h1, w1, pivot_h, pivot_w, box_max, values):
+    # every box lies inside the window spanned by the largest one, so only the
+    # window is masked, without reading h1 and w1 back to the host
+    n, h, w, c = out.shape
+    row_end, col_end = min(pivot_h + 2 * (box_max - 1), h), min(pivot_w + 2 * (box_max - 1), w)
+    if pivot_h >= row_end or pivot_w >= col_end:
+        return out
+    rows = torch.arange(pivot_h, row_end, device=out.device)
+    cols = torch.arange(pivot_w, col_end, device=out.device)
+    top = (pivot_h + h1)[:, None]
+    left = (pivot_w + w1)[:, None]
+    in_rows = (rows >= top) & (rows < top + h1[:, None])
+    in_cols = (cols >= left) & (cols < left + w1[:, None])
+    mask = (in_rows[:, :, None] & in_cols[:, None, :]).unsqueeze(-1)
+    window = out[:, pivot_h:row_end, pivot_w:col_end]
+    if torch.is_tensor(values):
+        window.copy_(torch.where(mask, values[:, None, None, :], window))
+    else:
+        window.masked_fill_(mask, values)
+    return out
+
+
+@functools.lru_cache(maxsize=4)
+def _gray_round_down(device):
+    # data_augs_procgen.RandGray truncates r*0.2989 + g*0.587 + b*0.114 computed
+    # in float64. That is (2989*r + 5870*g + 1140*b) // 10000 except where the sum
+    # is a multiple of 10000 and the float64 sum falls just below it. For every
+    # (r, g) at most one b in [0, 256) makes the sum a multiple of 10000; the
+    # table flags, at r * 256 + g, the pairs whose multiple is rounded down.
+    r, g = np.meshgrid(np.arange(256), np.arange(256), indexing='ij')
+    partial = 2989 * r + 5870 * g
+    # 1140*b = -partial (mod 10000) needs partial = 0 (mod 20), then 57*b = -partial/20 (mod 500)
+    b = (-(partial // 20) * pow(57, -1, 500)) % 500
+    tie = (partial % 20 == 0) & (b < 256)
+    exact = (partial + 1140 * b) // 10000
+    truncated = np.floor(r.astype(np.uint8) * 0.2989 + g.astype(np.uint8) * 0.587 + b * 0.114)
+    round_down = tie & (truncated < exact)
+    return torch.tensor(round_down.ravel(), dtype=torch.int32, device=device)
+
+
+def _integer_gray(imgs):
+    # the gray levels of NumPy's float64 weighting of integer b x h x w x 3 images, in int32
+    r, g, b = imgs.to(torch.int32).unbind(-1)
+    weighted = r * 2989 + g * 5870 + b * 1140
+    gray = torch.div(weighted, 10000, rounding_mode='floor')
+    return gray - _gray_round_down(imgs.device)[r * 256 + g] * (gray * 10000 == weighted)
+
+
+@functools.lru_cache(maxsize=16)
+def crop_resize_tables(in_size, scale_size, crop_size, crop_max, device):
+    # data_augs_procgen.crop_resize_tables, cached on the device
+    tables = data_augs_procgen.crop_resize_tables(in_size, scale_size, crop_size, crop_max)
+    return [torch.tensor(table, device=device) for table in tables]
+
+
+class RandGray(object):
+    def __init__(self,
+                 batch_size,
+                 p_rand=0.5,
+                 device='cpu',
+                 *_args,
+                 **_kwargs):
+
+        self.p_gray = p_rand
+        self.batch_size = batch_size
+        self._device = torch.device(device)
+        self.random_inds = torch.empty(batch_size, dtype=torch.bool, device=self._device)
+        self.change_randomization_params_all()
+
+    def grayscale(self, imgs):
+        # imgs: b x h x w x c. Float images are weighted in their dtype, integer
+        # ones like NumPy does: on the CPU by NumPy itself, on a view of the same
+        # memory, elsewhere in int32 (see _integer_gray)
+        if imgs.is_floating_point():
+            gray = imgs[..., 0] * 0.2989 + imgs[..., 1] * 0.587 + imgs[..., 2] * 0.114
+        elif imgs.device.type == 'cpu':
+            return torch.from_numpy(data_augs_procgen.RandGray.grayscale(self, imgs.numpy())).to(imgs.dtype)
+        else:
+            gray = _integer_gray(imgs)
+        return gray.to(torch.uint8).to(imgs.dtype).unsqueeze(-1).expand_as(imgs)
+
+    def do_augmentation(self, images, out=None):
+        # images: b x h x w x c; only the selected images are converted
+        out = images.clone() if out is None else out.copy_(images)
+        inds = self.random_inds[:len(images)].nonzero().view(-1)
+        if len(inds) == 0:
+            return out
+        return out.index_copy_(0, inds, self.grayscale(images.index_select(0, inds)))
+
+    def change_randomization_params(self, index_):
+        self.random_inds[index_] = bool(torch.rand(1) < self.p_gray)
+
+    def change_randomization_params_all(self):
+        self.random_inds.bernoulli_(self.p_gray)
+
+    def print_parms(self):
+        print(self.random_inds)
+
+
+class Cutout(object):
+    def __init__(self,
+                 batch_size,
+                 box_min=7,
+                 box_max=22,
+                 pivot_h=12,
+                 pivot_w=24,
+                 device='cpu',
+                 *_args,
+                 **_kwargs):
+
+        self.box_min = box_min
+        self.box_max = box_max
+        self.pivot_h = pivot_h
+        self.pivot_w = pivot_w
+        self.batch_size = batch_size
+        self._device = torch.device(device)
+        self.w1 = torch.randint(self.box_min, self.box_max, (batch_size,), device=self._device)
+        self.h1 = torch.randint(self.box_min, self.box_max, (batch_size,), device=self._device)
+
+    def do_augmentation(self, imgs, out=None):
+        n, h, w, c = imgs.shape
+        out = imgs.clone() if out is None else out.copy_(imgs)
+        return _fill_boxes(out, self.h1[:n], self.w1[:n], self.pivot_h, self.pivot_w, self.box_max, 0)
+
+    def change_randomization_params(self, index_):
+        self.w1[index_] = np.random.randint(self.box_min, self.box_max)
+        self.h1[index_] = np.random.randint(self.box_min, self.box_max)
+
+    def change_randomization_params_all(self):
+        self.w1.random_(self.box_min, self.box_max)
+        self.h1.random_(self.box_min, self.box_max)
+
+    def print_parms(self):
+        print(self.w1)
+        print(self.h1)
+
+
+class Cutout_Color(object):
+    def __init__(self,
+                 batch_size,
+                 box_min=7,
+                 box_max=22,
+                 pivot_h=12,
+                 pivot_w=24,
+                 obs_dtype='uint8',
+                 device='cpu',
+                 *_args,
+                 **_kwargs):
+
+        self.box_min = box_min
+        self.box_max = box_max
+        self.pivot_h = pivot_h
+        self.pivot_w = pivot_w
+        self.batch_size = batch_size
+        self._device = torch.device(device)
+        self.obs_dtype = getattr(torch, obs_dtype)
+        self.w1 = torch.randint(self.box_min, self.box_max, (batch_size,), device=self._device)
+        self.h1 = torch.randint(self.box_min, self.box_max, (batch_size,), device=self._device)
+        self.rand_box = torch.randint(0, 255, (batch_size, 1, 1, 3), dtype=self.obs_dtype, device=self._device)
+
+    def do_augmentation(self, imgs, out=None):
+        n, h, w, c = imgs.shape
+        out = imgs.clone() if out is None else out.copy_(imgs)
+        colors = self.rand_box[:n, 0, 0].to(imgs.dtype)
+        return _fill_boxes(out, self.h1[:n], self.w1[:n], self.pivot_h, self.pivot_w, self.box_max, colors)
+
+    def change_randomization_params(self, index_):
+        self.w1[index_] = np.random.randint(self.box_min, self.box_max)
+        self.h1[index_] = np.random.randint(self.box_min, self.box_max)
+        self.rand_box[index_] = torch.randint(0, 255, (1, 1, 3), dtype=self.obs_dtype, device=self._device)
+
+    def change_randomization_params_all(self):
+        self.w1.random_(self.box_min, self.box_max)
+        self.h1.random_(self.box_min, self.box_max)
+        self.rand_box.random_(0, 255)
+
+    def print_parms(self):
+        print(self.w1)
+        print(self.h1)
+
+class Rand_Flip(object):
+    def __init__(self,
+                 batch_size,
+                 p_rand=0.5,
+                 device='cpu',
+                 *_args,
+                 **_kwargs):
+
+        self.p_flip = p_rand
+        self.batch_size = batch_size
+        self._device = torch.device(device)
+        self.random_inds = torch.empty(batch_size, dtype=torch.bool, device=self._device)
+        self.change_randomization_params_all()
+
+    def do_augmentation(self, images, out=None):
+        return torch.where(self.random_inds[:, None, None, None], images.flip(2), images, out=out)
+
+    def change_randomization_params(self, index_):
+        self.random_inds[index_] = bool(torch.rand(1) < self.p_flip)
+
+    def change_randomization_params_all(self):
+        self.random_inds.bernoulli_(self.p_flip)
+
+    def print_parms(self):
+        print(self.random_inds)
+
+class Rand_Rotate(object):
+    def __init__(self,
+                 batch_size,
+                 device='cpu',
+                 *_args,
+                 **_kwargs):
+
+        self.batch_size = batch_size
+        self._device = torch.device(device)
+        self._inds = torch.arange(batch_size, device=self._device)
+        self.random_inds = torch.empty(batch_size, dtype=torch.int64, device=self._device)
+        self.change_randomization_params_all()
+
+    def do_augmentation(self, imgs, out=None):
+        # gather every image through the pixel permutation of its rotation
+        # instead of materialising all four rotated copies of the batch
+        n, h, w, c = imgs.shape
+        grid = torch.arange(h * w, device=imgs.device).view(h, w)
+        perms = torch.stack([torch.rot90(grid, k, (0, 1)).reshape(-1) for k in range(4)])
+        index = perms[self.random_inds // self.batch_size].unsqueeze(-1).expand(-1, -1, c)
+        if out is None:
+            return torch.gather(imgs.reshape(n, h * w, c), 1, index).view(n, h, w, c)
+        torch.gather(imgs.reshape(n, h * w, c), 1, index, out=out.view(n, h * w, c))
+        return out
+
+    def change_randomization_params(self, index_):
+        temp = np.random.randint(4)
+        self.random_inds[index_] = index_ + temp * self.batch_size
+
+    def change_randomization_params_all(self):
+        self.random_inds.random_(0, 4).mul_(self.batch_size).add_(self._inds)
+
+    def print_parms(self):
+        print(self.random_inds)
+
+class Rand_Crop(object):
+    def __init__(self,
+                 batch_size,
+                 device='cpu',
+                 *_args,
+                 **_kwargs):
+
+        self.batch_size = batch_size
+        self._device = torch.device(device)
+        self.crop_size = 64
+        self.scale_size = 84
+        self.crop_max = 75 - self.crop_size
+        self.w1 = torch.randint(0, self.crop_max, (self.batch_size,), device=self._device)
+        self.h1 = torch.randint(0, self.crop_max, (self.batch_size,), device=self._device)
+
+    def do_augmentation(self, imgs, out=None):
+        # procgen give 64x64, thus first scale-up to 84, then crop back to 64.
+        # Only the cropped pixels of the upscaled images are interpolated, see
+        # data_augs_procgen.Rand_Crop
+        n, h, w, c = imgs.shape
+
+        rows0, rows1, weights = crop_resize_tables(h, self.scale_size, self.crop_size, self.crop_max, imgs.device)
+        weights = weights[self.h1].view(n, -1, 1, 1)
+        inds = torch.arange(n, device=imgs.device)[:, None]
+        imgs = imgs[inds, rows0[self.h1]] * (1 - weights) + imgs[inds, rows1[self.h1]] * weights
+
+        cols0, cols1, weights = crop_resize_tables(w, self.scale_size, self.crop_size, self.crop_max, imgs.device)
+        weights = weights[self.w1].view(n, 1, -1, 1)
+        cols0 = cols0[self.w1].view(n, 1, -1, 1).expand(-1, self.crop_size, -1, c)
+        cols1 = cols1[self.w1].view(n, 1, -1, 1).expand(-1, self.crop_size, -1, c)
+        return torch.add(torch.gather(imgs, 2, cols0) * (1 - weights), torch.gather(imgs, 2, cols1) * weights, out=out)
+
+    def change_randomization_params(self, index_):
+        self.w1[index_] = np.random.randint(0, self.crop_max)
+        self.h1[index_] = np.random.randint(0, self.crop_max)
+
+    def change_randomization_params_all(self):
+        self.w1.random_(0, self.crop_max)
+        self.h1.random_(0, self.crop_max)
+
+    def print_parms(self):
+        print(self.w1)
+        print(self.h1)
+
+class Center_Crop(object):
+    def __init__(self,
+                 *_args,
+                 **_kwargs):
+        self.crop_size = 64
+
+    def do_augmentation(self, image, out=None):
+        h, w = image.shape[1], image.shape[2]
+        new_h, new_w = self.crop_size, self.crop_size
+
+        top = (h - new_h)//2
+        left = (w - new_w)//2
+        image = image[:, top:top + new_h, left:left + new_w, :]
+        if out is None:
+            return image.clone()
+        return out.copy_(image)
+
+    def change_randomization_params(self, index_):
+        index_ = index_
+
+    def change_randomization_params_all(self):
+        index_ = 0
+
+    def print_parms(self):
+        print('nothing')
+
+class ColorJitterLayer(data_augs_procgen.ColorJitterLayer):
+    def __init__(self,
+                 batch_size,
+                 brightness=0.4,
+                 contrast=0.4,
+                 saturation=0.4,
+                 hue=0.5,
+                 p_rand=1.0,
+                 stack_size=1,
+                 device='cpu',
+                 *_args,
+                 **_kwargs):
+        super(ColorJitterLayer, self).__init__(batch_size,
+                                               brightness=brightness,
+                                               contrast=contrast,
+                                               saturation=saturation,
+                                               hue=hue,
+                                               p_rand=p_rand,
+                                               stack_size=stack_size,
+                                               device=device)
+
+    def do_augmentation(self, imgs, out=None):
+        # imgs: b x h x w x c, the output stays on the device of imgs
+        inputs = imgs.permute(0, 3, 1, 2).float() / 255.0
+        if out is None:
+            return (self.forward(inputs) * 255.0).permute(0, 2, 3, 1)
+        torch.mul(self.forward(inputs), 255.0, out=out.permute(0, 3, 1, 2))
+        return out
+
+    def change_randomization_params_all(self):
+        for factor, value in [(self.factor_contrast, self.contrast),
+                              (self.factor_hue, self.hue),
+                              (self.factor_brightness, self.brightness),
+                              (self.factor_saturate, self.saturation)]:
+            factor = factor.view(self.batch_size, self.stack_size)
+            factor[:, 0].uniform_(*value)
+            factor[:, 1:] = factor[:, :1]
+
+
+augmentations = {
+    'Cutout': Cutout,
+    'Cutout_Color': Cutout_Color,
+    'Rand_Crop': Rand_Crop,
+    'Center_Crop': Center_Crop,
+    'RandGray': RandGray,
+    'Rand_Flip': Rand_Flip,
+    'Rand_Rotate': Rand_Rotate,
+    'ColorJitterLayer': ColorJitterLayer,
+}
+
+
+class AugmentationPipeline(object):
+    """Applies one augmentation type with fresh random parameters on every call.
+
+    Meant to be created once per run. It keeps an augmentation object and an
+    output buffer for every batch size it is called with (num_envs in the
+    rollout, minibatch_size in the update), and re-randomizes the parameters
+    of the cached object in place instead of constructing a new one. The
+    returned tensor is overwritten by the next call with the same batch shape.
+    Unknown aug_type names fall back to Cutout_Color, like convert_obs did.
+    """
+    def __init__(self, aug_type, device='cpu'):
+        self.aug_type = aug_type
+        self.aug_class = augmentations.get(aug_type, Cutout_Color)
+        self._device = torch.device(device)
+        self._augs = {}
+        self._outputs = {}
+
+    def __call__(self, obs):
+        n = obs.shape[0]
+        rand_aug = self._augs.get(n)
+        if rand_aug is None:
+            rand_aug = self._augs[n] = self.aug_class(batch_size=n, device=self._device)
+        else:
+            rand_aug.change_randomization_params_all()
+
+        key = (tuple(obs.shape), obs.dtype)
+        out = self._outputs.get(key)
+        if out is None:
+            out = self._outputs[key] = rand_aug.do_augmentation(obs)
+            return out
+        return rand_aug.do_augmentation(obs, out=out)
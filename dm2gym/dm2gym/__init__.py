@@ -1,10 +1,48 @@
 from gym.envs import register
-from dm_control import suite
 
 
-for domain_name, task_name in suite.ALL_TASKS:
-    ID = f'{domain_name.capitalize()}{task_name.capitalize()}-v0'
-    register(id=ID, 
+# suite.ALL_TASKS of dm_control, listed here so that importing dm2gym does not
+# import dm_control and every suite domain; they are only loaded by the entry
+# point when an environment is made. Regenerate with
+#     python -c "from dm_control import suite; print(suite.ALL_TASKS)"
+ALL_TASKS = (
+    ('acrobot', 'swingup'), ('acrobot', 'swingup_sparse'),
+    ('ball_in_cup', 'catch'),
+    ('cartpole', 'balance'), ('cartpole', 'balance_sparse'), ('cartpole', 'swingup'), ('cartpole', 'swingup_sparse'),
+    ('cartpole', 'two_poles'), ('cartpole', 'three_poles'),
+    ('cheetah', 'run'),
+    ('dog', 'stand'), ('dog', 'walk'), ('dog', 'trot'), ('dog', 'run'), ('dog', 'fetch'),
+    ('finger', 'spin'), ('finger', 'turn_easy'), ('finger', 'turn_hard'),
+    ('fish', 'upright'), ('fish', 'swim'),
+    ('hopper', 'stand'), ('hopper', 'hop'),
+    ('humanoid', 'stand'), ('humanoid', 'walk'), ('humanoid', 'run'), ('humanoid', 'run_pure_state'),
+    ('humanoid_CMU', 'stand'), ('humanoid_CMU', 'walk'), ('humanoid_CMU', 'run'),
+    ('lqr', 'lqr_2_1'), ('lqr', 'lqr_6_2'),
+    ('manipulator', 'bring_ball'), ('manipulator', 'bring_peg'), ('manipulator', 'insert_ball'),
+    ('manipulator', 'insert_peg'),
+    ('pendulum', 'swingup'),
+    ('point_mass', 'easy'), ('point_mass', 'hard'),
+    ('quadruped', 'walk'), ('quadruped', 'run'), ('quadruped', 'escape'), ('quadruped', 'fetch'),
+    ('reacher', 'easy'), ('reacher', 'hard'),
+    ('stacker', 'stack_2'), ('stacker', 'stack_4'),
+    ('swimmer', 'swimmer6'), ('swimmer', 'swimmer15'),
+    ('walker', 'stand'), ('walker', 'walk'), ('walker', 'run'),
+)
+
+
+def register_task(domain_name, task_name, id=None, frame_skip=1, **kwargs):
+    r"""Registers a suite task; the keyword arguments are passed on to ``DMSuiteEnv``.
+
+    With ``frame_skip`` every step of the environment repeats the action for that many
+    control steps, and the time limit is the one of the 1000 control steps of the suite.
+    """
+    if id is None:
+        id = f'{domain_name.capitalize()}{task_name.capitalize()}-v0'
+    register(id=id, 
              entry_point='dm2gym.envs:DMSuiteEnv', 
-             kwargs={'domain_name': domain_name, 'task_name': task_name}, 
-             max_episode_steps=1000)
+             kwargs=dict(kwargs, domain_name=domain_name, task_name=task_name, frame_skip=frame_skip), 
+             max_episode_steps=(1000 + frame_skip - 1) // frame_skip)
+
+
+for domain_name, task_name in ALL_TASKS:
+    register_task(domain_name, task_name)
@@ -1,2 +1,10 @@
 from .dm_suite_env import DMSuiteEnv
-from .opencv_image_viewer import OpenCVImageViewer
+from .batched_dm_suite_env import BatchedDMSuiteEnv
+
+
+def __getattr__(name):
+    # OpenCV is only imported when the OpenCV viewer is used
+    if name == 'OpenCVImageViewer':
+        from .opencv_image_viewer import OpenCVImageViewer
+        return OpenCVImageViewer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from gym.vector import VectorEnv
+
+from dm_control import suite
+
+from .dm_suite_env import convert_dm_control_to_gym_space
+from .dm_suite_env import flat_observation_index
+from .dm_suite_env import write_flat_observation
+
+
+class BatchedDMSuiteEnv(VectorEnv):
+    r"""Steps ``num_envs`` dm_control environments of one task in a single process.
+
+    Observations are flattened into one preallocated ``(num_envs, obs_dim)`` float32
+    array, rewards and dones go into arrays as well. With ``num_threads > 0`` the
+    environments are split into contiguous blocks stepped by a thread pool (MuJoCo
+    releases the GIL while stepping the physics), otherwise they are stepped in a loop.
+    Each step repeats the actions for ``frame_skip`` control steps, summing the rewards
+    and stopping at the end of an episode, as in ``DMSuiteEnv``.
+    Environments are reset automatically when done, with the last observation in
+    ``info['terminal_observation']``. With ``copy=False`` the observation array is
+    returned itself and overwritten by the next step.
+    """
+    def __init__(self, domain_name, task_name, num_envs, task_kwargs=None, environment_kwargs=None,
+                 visualize_reward=False, num_threads=0, copy=True, frame_skip=1):
+        self.envs = [suite.load(domain_name,
+                                task_name,
+                                task_kwargs=task_kwargs,
+                                environment_kwargs=environment_kwargs,
+                                visualize_reward=visualize_reward) for _ in range(num_envs)]
+        self.frame_skip = frame_skip
+        self.metadata = {'render.modes': ['rgb_array'],
+                         'video.frames_per_second': round(1.0/(self.envs[0].control_timestep()*frame_skip))}
+        observation_space, self.observation_index = flat_observation_index(self.envs[0].observation_spec())
+        action_space = convert_dm_control_to_gym_space(self.envs[0].action_spec())
+        super(BatchedDMSuiteEnv, self).__init__(num_envs, observation_space, action_space)
+
+        self.copy = copy
+        self.observations = np.zeros((num_envs,) + observation_space.shape, dtype=np.float32)
+        self.rewards = np.zeros(num_envs, dtype=np.float64)
+        self.dones = np.zeros(num_envs, dtype=np.bool_)
+        num_threads = min(num_threads, num_envs)
+        self._executor = ThreadPoolExecutor(max_workers=num_threads) if num_threads > 0 else None
+        bounds = np.linspace(0, num_envs, max(num_threads, 1) + 1).astype(int)
+        self._blocks = [range(start, end) for start, end in zip(bounds[:-1], bounds[1:])]
+        self._actions = None
+
+    def _map(self, fn):
+        # fn(block) for every block of envs, on the thread pool if there is one
+        if self._executor is None:
+            return [fn(block) for block in self._blocks]
+        return list(self._executor.map(fn, self._blocks))
+
+    def _observations(self):
+        return np.copy(self.observations) if self.copy else self.observations
+
+    def seed(self, seed=None):
+        if seed is None or isinstance(seed, int):
+            seed = [None if seed is None else seed + i for i in range(self.num_envs)]
+        assert len(seed) == self.num_envs
+        for env, single_seed in zip(self.envs, seed):
+            env.task.random.seed(single_seed)
+
+    def _reset_block(self, block):
+        for i in block:
+            write_flat_observation(self.envs[i].reset().observation, self.observation_index, self.observations[i])
+
+    def reset_async(self, seed=None, return_info=False, options=None):
+        assert not return_info, "return_info is not supported"
+        if seed is not None:
+            self.seed(seed)
+
+    def reset_wait(self, timeout=None, seed=None, return_info=False, options=None):
+        self._map(self._reset_block)
+        return self._observations()
+
+    def _step_block(self, block):
+        infos = []
+        for i in block:
+            env = self.envs[i]
+            reward = 0.0
+            for _ in range(self.frame_skip):
+                timestep = env.step(self._actions[i])
+                reward += timestep.reward or 0.0
+                if timestep.last():
+                    break
+            self.rewards[i] = reward
+            self.dones[i] = timestep.last()
+            info = {}
+            if self.dones[i]:
+                info['terminal_observation'] = write_flat_observation(
+                    timestep.observation, self.observation_index, np.empty_like(self.observations[i]))
+                timestep = env.reset()
+            write_flat_observation(timestep.observation, self.observation_index, self.observations[i])
+            infos.append(info)
+        return infos
+
+    def step_async(self, actions):
+        self._actions = actions
+
+    def step_wait(self, timeout=None):
+        infos = sum(self._map(self._step_block), [])
+        return self._observations(), np.copy(self.rewards), np.copy(self.dones), infos
+
+    def call(self, name, *args, **kwargs):
+        results = []
+        for env in self.envs:
+            function = getattr(env, name)
+            results.append(function(*args, **kwargs) if callable(function) else function)
+        return tuple(results)
+
+    def render(self, mode='rgb_array', **kwargs):
+        if 'camera_id' not in kwargs:
+            kwargs['camera_id'] = 0  # Tracking camera
+        if mode != 'rgb_array':
+            raise NotImplementedError
+        return np.stack([env.physics.render(**kwargs) for env in self.envs])
+
+    def close_extras(self, **kwargs):
+        if self._executor is not None:
+            self._executor.shutdown()
+        for env in self.envs:
+            env.close()
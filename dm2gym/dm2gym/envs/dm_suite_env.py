@@ -1,3 +1,6 @@
+from collections import OrderedDict
+
+import numpy as np
 import gym
 from gym import spaces
 
@@ -25,34 +28,99 @@ def convert_dm_control_to_gym_space(dm_control_space):
         return space
 
 
+def flat_observation_index(observation_spec):
+    r"""Returns the flat float32 Box of a dm_control observation dict and the slice of each key in it. """
+    index = OrderedDict()
+    start = 0
+    for key, spec in observation_spec.items():
+        size = int(np.prod(spec.shape))
+        index[key] = slice(start, start + size)
+        start += size
+    space = spaces.Box(low=-float('inf'),
+                       high=float('inf'),
+                       shape=(start,),
+                       dtype=np.float32)
+    return space, index
+
+
+def write_flat_observation(observation, index, out):
+    r"""Writes each key of a dm_control observation dict into its slice of ``out``. """
+    for key, item in index.items():
+        out[item] = np.ravel(observation[key])
+    return out
+
+
 class DMSuiteEnv(gym.Env):
-    def __init__(self, domain_name, task_name, task_kwargs=None, environment_kwargs=None, visualize_reward=False):
+    r"""Gym environment of a dm_control suite task.
+
+    With ``flatten_observation=True`` the observation dict is written key by key into
+    slices of one reusable float32 array (``observation_index`` maps each key to its
+    slice) and the observation space is a ``Box``. The returned array is overwritten by
+    the next step or reset, except for the last observation of an episode, which is a copy.
+
+    With ``from_pixels=True`` the observations are the last ``frame_stack`` frames of
+    camera ``camera_id``, rendered offscreen into the ring buffer of a ``PixelRenderer``
+    and returned as views of it, with the same rule for the last observation.
+
+    Each step repeats the action for ``frame_skip`` control steps, summing their rewards
+    and stopping at the end of the episode; only the last frame is observed or rendered.
+    """
+    def __init__(self, domain_name, task_name, task_kwargs=None, environment_kwargs=None, visualize_reward=False,
+                 flatten_observation=False, from_pixels=False, height=84, width=84, camera_id=0, frame_skip=1,
+                 frame_stack=1, channels_first=True):
         self.env = suite.load(domain_name, 
                               task_name, 
                               task_kwargs=task_kwargs, 
                               environment_kwargs=environment_kwargs, 
                               visualize_reward=visualize_reward)
+        self.frame_skip = frame_skip
         self.metadata = {'render.modes': ['human', 'rgb_array'],
-                         'video.frames_per_second': round(1.0/self.env.control_timestep())}
+                         'video.frames_per_second': round(1.0/(self.env.control_timestep()*frame_skip))}
 
-        self.observation_space = convert_dm_control_to_gym_space(self.env.observation_spec())
+        self.flatten_observation = flatten_observation
+        self.pixels = None
+        if from_pixels:
+            from .pixel_renderer import PixelRenderer
+            self.pixels = PixelRenderer(self.env.physics, height, width, camera_id, frame_stack, channels_first)
+            self.observation_space = self.pixels.observation_space
+        elif flatten_observation:
+            self.observation_space, self.observation_index = flat_observation_index(self.env.observation_spec())
+            self._flat_observation = np.zeros(self.observation_space.shape, dtype=np.float32)
+        else:
+            self.observation_space = convert_dm_control_to_gym_space(self.env.observation_spec())
         self.action_space = convert_dm_control_to_gym_space(self.env.action_spec())
         self.viewer = None
     
     def seed(self, seed):
         return self.env.task.random.seed(seed)
+
+    def _get_observation(self, timestep):
+        if self.pixels is not None:
+            observation = self.pixels.reset() if timestep.first() else self.pixels.step()
+        elif self.flatten_observation:
+            observation = write_flat_observation(timestep.observation, self.observation_index, self._flat_observation)
+        else:
+            return timestep.observation
+        if timestep.last():
+            # vector envs keep the last observation while resetting
+            return observation.copy()
+        return observation
     
     def step(self, action):
-        timestep = self.env.step(action)
-        observation = timestep.observation
-        reward = timestep.reward
+        reward = 0.0
+        for _ in range(self.frame_skip):
+            timestep = self.env.step(action)
+            reward += timestep.reward or 0.0
+            if timestep.last():
+                break
+        observation = self._get_observation(timestep)
         done = timestep.last()
         info = {}
         return observation, reward, done, info
     
     def reset(self):
         timestep = self.env.reset()
-        return timestep.observation
+        return self._get_observation(timestep)
     
     def render(self, mode='human', **kwargs):
         if 'camera_id' not in kwargs:
@@ -79,4 +147,7 @@ class DMSuiteEnv(gym.Env):
         if self.viewer is not None:
             self.viewer.close()
             self.viewer = None
+        if self.pixels is not None:
+            self.pixels.close()
+            self.pixels = None
         return self.env.close()
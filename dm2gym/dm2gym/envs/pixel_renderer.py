@@ -0,0 +1,87 @@
+import mujoco
+import numpy as np
+from gym import spaces
+
+from dm_control.mujoco.engine import Camera
+
+# frames the ring buffer holds per stacked frame
+RING_FRAMES_PER_STACK = 8
+
+
+class PixelRenderer(object):
+    r"""Renders the observations of the pixel mode into a preallocated uint8 ring buffer.
+
+    One offscreen ``Camera`` is kept for the whole episode instead of the new camera and
+    scene of every ``physics.render`` call. Its scene is rendered with ``mjr_render`` and
+    read back with ``mjr_readPixels`` into one reused buffer, from which each frame is
+    copied once, flipped upright, into the next slot of a ring of
+    ``RING_FRAMES_PER_STACK * frame_stack`` frames. The last ``frame_stack`` frames are
+    always a contiguous window of the ring: once it is full, the newest
+    ``frame_stack - 1`` frames are moved to its start. ``observation()`` returns a view
+    of the window, stacked along the channel axis, ``(3 * frame_stack, height, width)``
+    with ``channels_first`` and ``(height, width, 3 * frame_stack)`` otherwise. The view
+    is overwritten by later frames.
+    """
+    def __init__(self, physics, height=84, width=84, camera_id=0, frame_stack=1, channels_first=True):
+        self.physics = physics
+        self.camera = Camera(physics, height=height, width=width, camera_id=camera_id)
+        self.frame_stack = frame_stack
+        self.channels_first = channels_first
+        self.channel_axis = 0 if channels_first else 2
+        self.ring_frames = RING_FRAMES_PER_STACK * frame_stack
+        if channels_first:
+            shape = (3 * frame_stack, height, width)
+            self._ring = np.zeros((3 * self.ring_frames, height, width), dtype=np.uint8)
+        else:
+            shape = (height, width, 3 * frame_stack)
+            self._ring = np.zeros((height, width, 3 * self.ring_frames), dtype=np.uint8)
+        self.observation_space = spaces.Box(low=0, high=255, shape=shape, dtype=np.uint8)
+        self._rect = mujoco.MjrRect(0, 0, width, height)
+        # mjr_readPixels writes the bottom row first
+        self._pixels = np.zeros((height, width, 3), dtype=np.uint8)
+        frame = self._pixels[::-1]
+        self._frame = frame.transpose(2, 0, 1) if channels_first else frame
+        self._end = frame_stack
+
+    def _slots(self, start, stop):
+        # the channels of frame slots [start, stop)
+        channels = slice(3 * start, 3 * stop)
+        if self.channels_first:
+            return self._ring[channels]
+        return self._ring[:, :, channels]
+
+    def _render_on_gl_thread(self):
+        context = self.physics.contexts.mujoco.ptr
+        mujoco.mjr_render(self._rect, self.camera.scene.ptr, context)
+        mujoco.mjr_readPixels(self._pixels, None, self._rect, context)
+
+    def _render(self):
+        self.camera.update()
+        with self.physics.contexts.gl.make_current() as ctx:
+            ctx.call(self._render_on_gl_thread)
+
+    def observation(self):
+        return self._slots(self._end - self.frame_stack, self._end)
+
+    def reset(self):
+        r"""Fills the whole stack with the first frame of an episode. """
+        self._render()
+        for i in range(self.frame_stack):
+            np.copyto(self._slots(i, i + 1), self._frame)
+        self._end = self.frame_stack
+        return self.observation()
+
+    def step(self):
+        r"""Renders a new frame after the newest one. """
+        if self._end == self.ring_frames:
+            keep = self.frame_stack - 1
+            np.copyto(self._slots(0, keep), self._slots(self._end - keep, self._end))
+            self._end = keep
+        self._render()
+        np.copyto(self._slots(self._end, self._end + 1), self._frame)
+        self._end += 1
+        return self.observation()
+
+    def close(self):
+        # the scene of the camera is freed with it
+        self.camera = None
@@ -0,0 +1,19 @@
+"""The shared PPO training engine of the *ppo_*.py scripts.
+
+One rollout engine (engine.rollout), one PPO learner (engine.learner) and
+the advantage computation of gae.py, extended through the hooks of
+engine.hooks: BAE bootstraps from augmented values, DrAC adds an auxiliary
+loss and RAD transforms the learner's input. A script picks an env family
+of engine.envs and a hook:
+
+    args = parse_args(DMC, RADHook)
+    train(args, DMC, RADHook())
+"""
+from engine.agents import ImpalaAgent, MLPAgent
+from engine.config import parse_args
+from engine.envs import DMC, PROCGEN, PYBULLET, EnvFamily, convert_obs
+from engine.hooks import AugmentationHook, BAEHook, DrACHook, Hook, RADHook
+from engine.learner import PPOLearner
+from engine.pipeline import Pipeline
+from engine.rollout import RolloutEngine
+from engine.train import train
@@ -0,0 +1,105 @@
+import argparse
+import os
+import sys
+from distutils.util import strtobool
+
+from engine.hooks import Hook
+
+
+def parse_args(family, hook_class=Hook, metrics=False):
+    """The command line of a training script for family and hook_class.
+
+    The hyperparameter defaults are the ones of family.defaults; metrics
+    adds --metrics-format for the scripts that also write metrics files.
+    """
+    # fmt: off
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--exp-name", type=str, default=os.path.basename(sys.argv[0]).rstrip(".py"),
+        help="the name of this experiment")
+    family.add_env_args(parser)
+    parser.add_argument("--learning-rate", type=float,
+        help="the learning rate of the optimizer")
+    parser.add_argument("--seed", type=int, default=1,
+        help="seed of the experiment")
+    parser.add_argument("--total-timesteps", type=int,
+        help="total timesteps of the experiments")
+    parser.add_argument("--torch-deterministic", type=lambda x: bool(strtobool(x)), default=True, nargs="?", const=True,
+        help="if toggled, `torch.backends.cudnn.deterministic=False`")
+    parser.add_argument("--cuda", type=lambda x: bool(strtobool(x)), default=True, nargs="?", const=True,
+        help="if toggled, cuda will be enabled by default")
+    parser.add_argument("--track", type=lambda x: bool(strtobool(x)), default=False, nargs="?", const=True,
+        help="if toggled, this experiment will be tracked with Weights and Biases")
+    parser.add_argument("--wandb-project-name", type=str,
+        help="the wandb's project name")
+    parser.add_argument("--wandb-entity", type=str, default=None,
+        help="the entity (team) of wandb's project")
+    parser.add_argument("--capture-video", type=lambda x: bool(strtobool(x)), default=False, nargs="?", const=True,
+        help="weather to capture videos of the agent performances (check out `videos` folder)")
+
+    # Algorithm specific arguments
+    parser.add_argument("--num-envs", type=int,
+        help="the number of parallel game environments")
+    parser.add_argument("--num-steps", type=int,
+        help="the number of steps to run in each environment per policy rollout")
+    parser.add_argument("--pipeline", type=lambda x: bool(strtobool(x)), default=False, nargs="?", const=True,
+        help="if toggled, the next rollout is collected while the current one is optimized")
+    parser.add_argument("--phase-timers", type=lambda x: bool(strtobool(x)), default=False, nargs="?", const=True,
+        help="if toggled, the time spent in each phase of an update is logged under timers/")
+    parser.add_argument("--profile-updates", type=str, default="",
+        help="the update iterations to profile, e.g. `10:12` or `10:12,50`")
+    parser.add_argument("--profile-backend", type=str, default="torch", choices=["torch", "cprofile", "pyspy"],
+        help="the profiler used for --profile-updates")
+    if family.make_test_envs is not None:
+        parser.add_argument("--async-eval", type=lambda x: bool(strtobool(x)), default=False, nargs="?", const=True,
+            help="if toggled, the generalization test runs in a separate process")
+        parser.add_argument("--eval-interval", type=int, default=0,
+            help="the number of global steps between generalization tests (0: after every update)")
+        parser.add_argument("--eval-steps", type=int, default=None,
+            help="the number of steps in which a generalization test starts the episodes it reports (default: num-steps)")
+        parser.add_argument("--eval-max-steps", type=int, default=None,
+            help="the maximum number of steps of a generalization test, finishing the episodes it started (default: 4 * eval-steps)")
+        parser.add_argument("--eval-episodes", type=int, default=0,
+            help="if set, a generalization test stops after reporting this many episodes")
+        parser.add_argument("--eval-greedy", type=lambda x: bool(strtobool(x)), default=False, nargs="?", const=True,
+            help="if toggled, the generalization test takes the most likely actions instead of sampling")
+    if metrics:
+        parser.add_argument("--metrics-format", type=str, nargs="+", default=["txt"], choices=["txt", "csv", "npz"],
+            help="the formats of the metrics files written next to the tensorboard logs")
+    parser.add_argument("--anneal-lr", type=lambda x: bool(strtobool(x)), nargs="?", const=True,
+        help="Toggle learning rate annealing for policy and value networks")
+    parser.add_argument("--gae", type=lambda x: bool(strtobool(x)), default=True, nargs="?", const=True,
+        help="Use GAE for advantage computation")
+    parser.add_argument("--gamma", type=float,
+        help="the discount factor gamma")
+    parser.add_argument("--gae-lambda", type=float, default=0.95,
+        help="the lambda for the general advantage estimation")
+    parser.add_argument("--num-minibatches", type=int,
+        help="the number of mini-batches")
+    parser.add_argument("--update-epochs", type=int,
+        help="the K epochs to update the policy")
+    parser.add_argument("--norm-adv", type=lambda x: bool(strtobool(x)), default=True, nargs="?", const=True,
+        help="Toggles advantages normalization")
+    parser.add_argument("--clip-coef", type=float, default=0.2,
+        help="the surrogate clipping coefficient")
+    parser.add_argument("--clip-vloss", type=lambda x: bool(strtobool(x)), default=True, nargs="?", const=True,
+        help="Toggles whether or not to use a clipped loss for the value function, as per the paper.")
+    parser.add_argument("--ent-coef", type=float,
+        help="coefficient of the entropy")
+    parser.add_argument("--vf-coef", type=float, default=0.5,
+        help="coefficient of the value function")
+    parser.add_argument("--max-grad-norm", type=float, default=0.5,
+        help="the maximum norm for the gradient clipping")
+    parser.add_argument("--target-kl", type=float, default=None,
+        help="the target KL divergence threshold")
+    family.add_algo_args(parser)
+    hook_class.add_args(parser, family)
+    parser.set_defaults(**family.defaults)
+
+    args = parser.parse_args()
+    args.batch_size = int(args.num_envs * args.num_steps)
+    args.minibatch_size = int(args.batch_size // args.num_minibatches)
+    if family.make_test_envs is not None:
+        args.eval_steps = args.eval_steps or args.num_steps
+        args.eval_max_steps = args.eval_max_steps or 4 * args.eval_steps
+    # fmt: on
+    return args
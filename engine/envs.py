@@ -0,0 +1,258 @@
+import time
+from distutils.util import strtobool
+
+import gym
+import numpy as np
+import torch
+
+from engine.agents import ImpalaAgent, MLPAgent
+from episode_stats import VectorEpisodeStatistics
+from vec_env import SubprocVectorEnv
+
+
+def make_procgen_envs(args, num_levels=200):
+    from procgen import ProcgenEnv
+
+    envs = ProcgenEnv(num_envs=args.num_envs, env_name=args.gym_id, num_levels=num_levels, start_level=0, distribution_mode="easy")
+    envs = gym.wrappers.TransformObservation(envs, lambda obs: obs["rgb"])
+    envs.single_action_space = envs.action_space
+    envs.single_observation_space = envs.observation_space["rgb"]
+    envs.is_vector_env = True
+    envs = VectorEpisodeStatistics(envs)
+    envs = gym.wrappers.NormalizeReward(envs)
+    envs = gym.wrappers.TransformReward(envs, lambda reward: np.clip(reward, -10, 10))
+    assert isinstance(envs.single_action_space, gym.spaces.Discrete), "only discrete action space is supported"
+    return envs
+
+
+def make_procgen_test_envs(args):
+    # the full level distribution, for the generalization test
+    return make_procgen_envs(args, num_levels=0)
+
+
+def wrap_continuous_env(env, seed, idx, capture_video, video_dir):
+    env = gym.wrappers.RecordEpisodeStatistics(env)
+    if capture_video:
+        if idx == 0:
+            env = gym.wrappers.RecordVideo(env, video_dir)
+    env = gym.wrappers.ClipAction(env)
+    env = gym.wrappers.NormalizeObservation(env)
+    env = gym.wrappers.TransformObservation(env, lambda obs: np.clip(obs, -10, 10))
+    env = gym.wrappers.NormalizeReward(env)
+    env = gym.wrappers.TransformReward(env, lambda reward: np.clip(reward, -10, 10))
+    env.seed(seed)
+    env.action_space.seed(seed)
+    env.observation_space.seed(seed)
+    return env
+
+
+def make_dmc_env(domain_name, task_name, seed, idx, capture_video, video_dir, action_repeat=1):
+    def thunk():
+        import dmc2gym  # pip install git+https://github.com/denisyarats/dmc2gym.git
+
+        env = dmc2gym.make(domain_name=domain_name, task_name=task_name, seed=seed, frame_skip=action_repeat)
+        return wrap_continuous_env(env, seed, idx, capture_video, video_dir)
+
+    return thunk
+
+
+def make_dmc_batched_envs(args):
+    # all envs in one BatchedDMSuiteEnv of the vendored dm2gym, with the
+    # wrappers of make_dmc_env applied to the whole batch
+    from dm2gym.envs import BatchedDMSuiteEnv
+
+    envs = BatchedDMSuiteEnv(args.domain_name, args.task_name, args.num_envs, num_threads=args.env_threads, copy=False,
+                             frame_skip=args.action_repeat)
+    envs.seed(args.seed)
+    envs = VectorEpisodeStatistics(envs)
+    envs = gym.wrappers.ClipAction(envs)
+    envs = gym.wrappers.NormalizeObservation(envs)
+    envs = gym.wrappers.TransformObservation(envs, lambda obs: np.clip(obs, -10, 10))
+    envs = gym.wrappers.NormalizeReward(envs)
+    envs = gym.wrappers.TransformReward(envs, lambda reward: np.clip(reward, -10, 10))
+    envs.action_space.seed(args.seed)
+    return envs
+
+
+def make_pybullet_env(gym_id, seed, idx, capture_video, video_dir):
+    def thunk():
+        import pybullet_envs  # noqa
+
+        env = gym.make(gym_id)
+        return wrap_continuous_env(env, seed, idx, capture_video, video_dir)
+
+    return thunk
+
+
+def convert_obs(obs, args):
+    # the augmentations of the continuous control scripts, on obs' device
+    if args.aug == 'gaussian_add':
+        return obs + torch.randn_like(obs)
+    elif args.aug == 'uniform_mul':
+        return obs * torch.empty_like(obs).uniform_(args.uniform_mul_r1, args.uniform_mul_r2)
+    return obs
+
+
+class EnvFamily(object):
+    """What the training loop needs to know about a family of environments.
+
+    defaults overrides the hyperparameter defaults of engine.config,
+    make_envs builds the vector env, agent_class is built on it and
+    make_augmenter returns the callable the augmentation hooks apply to
+    batches of observations. Families with make_test_envs run the
+    generalization test.
+    """
+    name = None
+    defaults = {}
+    obs_dtype = torch.float32
+    agent_class = None
+    default_aug = None
+    # where the tensorboard and wandb logs go, relative to the result directory
+    tb_dir = "runs"
+    wandb_dir = ""
+    make_test_envs = None
+
+    def add_env_args(self, parser):
+        pass
+
+    def add_algo_args(self, parser):
+        pass
+
+    def add_aug_args(self, parser):
+        parser.add_argument("--aug", type=str, default=self.default_aug,
+            help="the type of augmentation")
+
+    def run_name(self, args):
+        raise NotImplementedError
+
+    def make_envs(self, args, run_name, result_dir):
+        raise NotImplementedError
+
+    def make_augmenter(self, args, device):
+        raise NotImplementedError
+
+
+class ProcgenFamily(EnvFamily):
+    name = "procgen"
+    defaults = dict(learning_rate=5e-4, total_timesteps=int(25e6), wandb_project_name="bae_procgen", num_envs=64,
+                    num_steps=256, anneal_lr=False, gamma=0.999, num_minibatches=8, update_epochs=3, ent_coef=0.01)
+    obs_dtype = torch.uint8
+    agent_class = ImpalaAgent
+    default_aug = "Cutout_Color"
+    tb_dir = "tb_runs"
+    wandb_dir = "wandb_runs"
+    make_test_envs = staticmethod(make_procgen_test_envs)
+
+    def add_env_args(self, parser):
+        parser.add_argument("--gym-id", type=str, default="starpilot",
+            help="the id of the gym environment")
+
+    def add_algo_args(self, parser):
+        parser.add_argument("--baseline", type=str, default='value_baseline',
+            help="baseline to use")
+
+    def run_name(self, args):
+        if hasattr(args, "aug"):
+            return f"ppo__{args.gym_id}__{args.exp_name}__{args.aug}__{args.seed}__{int(time.time())}"
+        return f"ppo__{args.gym_id}__{args.exp_name}__{args.seed}__{int(time.time())}"
+
+    def make_envs(self, args, run_name, result_dir):
+        return make_procgen_envs(args)
+
+    def make_augmenter(self, args, device):
+        from data_augs_procgen_torch import AugmentationPipeline
+
+        return AugmentationPipeline(args.aug, device)
+
+
+class ContinuousFamily(EnvFamily):
+    defaults = dict(learning_rate=3e-4, total_timesteps=2000000, num_envs=1, num_steps=2048, anneal_lr=True, gamma=0.99,
+                    num_minibatches=32, update_epochs=10, ent_coef=0.0)
+    agent_class = MLPAgent
+    default_aug = "uniform_mul"
+
+    def add_algo_args(self, parser):
+        parser.add_argument("--async-envs", type=lambda x: bool(strtobool(x)), default=False, nargs="?", const=True,
+            help="if toggled, the environments are stepped in worker processes")
+        parser.add_argument("--num-workers", type=int, default=0,
+            help="the number of worker processes for --async-envs (0: one per env, up to the number of CPUs)")
+
+    def add_aug_args(self, parser):
+        super(ContinuousFamily, self).add_aug_args(parser)
+        parser.add_argument("--uniform_mul_r1", type=float, default=0.6,
+            help="the lower bound of the uniform_mul factors")
+        parser.add_argument("--uniform_mul_r2", type=float, default=1.2,
+            help="the upper bound of the uniform_mul factors")
+
+    def env_fns(self, args, video_dir):
+        raise NotImplementedError
+
+    def make_envs(self, args, run_name, result_dir):
+        env_fns = self.env_fns(args, f"{result_dir}videos/{run_name}")
+        # RolloutIO copies the observations out right away, so the vector envs
+        # return their own buffers instead of a copy per step
+        if args.async_envs:
+            envs = SubprocVectorEnv(env_fns, args.num_workers, copy=False)
+        else:
+            envs = gym.vector.SyncVectorEnv(env_fns, copy=False)
+        assert isinstance(envs.single_action_space, gym.spaces.Box), "only continuous action space is supported"
+        return envs
+
+    def make_augmenter(self, args, device):
+        def augment(obs):
+            return convert_obs(obs, args)
+        return augment
+
+
+class DMCFamily(ContinuousFamily):
+    name = "dmc"
+    defaults = dict(ContinuousFamily.defaults, wandb_project_name="bae_dmc")
+
+    def add_env_args(self, parser):
+        parser.add_argument("--domain-name", type=str, default="walker",
+            help="DMC domain name")
+        parser.add_argument("--task-name", type=str, default="walk",
+            help="DMC task name")
+
+    def add_algo_args(self, parser):
+        super(DMCFamily, self).add_algo_args(parser)
+        parser.add_argument("--batched-envs", type=lambda x: bool(strtobool(x)), default=False, nargs="?", const=True,
+            help="if toggled, all environments are stepped by one dm2gym BatchedDMSuiteEnv")
+        parser.add_argument("--env-threads", type=int, default=0,
+            help="the number of threads stepping the --batched-envs (0: a loop in the main thread)")
+        parser.add_argument("--action-repeat", type=int, default=1,
+            help="the number of control steps each action is repeated for inside the env (rewards are summed)")
+
+    def run_name(self, args):
+        return f"{args.domain_name}_{args.task_name}__{args.exp_name}__{args.seed}__{int(time.time())}"
+
+    def make_envs(self, args, run_name, result_dir):
+        if args.batched_envs:
+            assert not args.capture_video, "--capture-video is not supported with --batched-envs"
+            return make_dmc_batched_envs(args)
+        return super(DMCFamily, self).make_envs(args, run_name, result_dir)
+
+    def env_fns(self, args, video_dir):
+        return [make_dmc_env(args.domain_name, args.task_name, args.seed + i, i, args.capture_video, video_dir,
+                             args.action_repeat) for i in range(args.num_envs)]
+
+
+class PyBulletFamily(ContinuousFamily):
+    name = "pybullet"
+    defaults = dict(ContinuousFamily.defaults, wandb_project_name="bae_pybullet")
+
+    def add_env_args(self, parser):
+        parser.add_argument("--gym-id", type=str, default="HalfCheetahBulletEnv-v0",
+            help="the id of the gym environment")
+
+    def run_name(self, args):
+        return f"{args.gym_id}__{args.exp_name}__{args.seed}__{int(time.time())}"
+
+    def env_fns(self, args, video_dir):
+        return [make_pybullet_env(args.gym_id, args.seed + i, i, args.capture_video, video_dir)
+                for i in range(args.num_envs)]
+
+
+PROCGEN = ProcgenFamily()
+DMC = DMCFamily()
+PYBULLET = PyBulletFamily()
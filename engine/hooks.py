@@ -0,0 +1,143 @@
+from distutils.util import strtobool
+
+import torch
+
+from gae import compute_advantages
+
+
+class Hook(object):
+    """The extension points of the rollout engine and the PPO learner.
+
+    The base class is plain PPO. act() and bootstrap() return the value
+    estimates of value_streams streams, stream 0 being the one of the
+    policy's own observations; advantages() turns them into the
+    (advantages, returns) the learner is trained on. transform_obs() is
+    applied to every minibatch of observations before the forward pass and
+    aux_loss() may return a term added to the PPO loss.
+    """
+    value_streams = 1
+
+    @staticmethod
+    def add_args(parser, family):
+        pass
+
+    def setup(self, args, family, device, timer):
+        self.args = args
+
+    def act(self, policy, obs):
+        action, logprob, _, value = policy.get_action_and_value(obs)
+        return action, logprob, value.view(1, -1)
+
+    def bootstrap(self, policy, rollout):
+        return policy.get_value(rollout.next_obs).reshape(1, -1)
+
+    def advantages(self, rollout, next_values):
+        return compute_advantages(rollout.rewards, rollout.values, rollout.dones, next_values, rollout.next_done,
+                                  self.args.gamma, self.args.gae_lambda, gae=self.args.gae)
+
+    def transform_obs(self, obs):
+        return obs
+
+    def aux_loss(self, agent, obs, actions, newlogprob, newvalue):
+        return None
+
+
+class AugmentationHook(Hook):
+    # the base of the hooks that augment observations with the family's augmenter
+    @staticmethod
+    def add_args(parser, family):
+        family.add_aug_args(parser)
+
+    def setup(self, args, family, device, timer):
+        super(AugmentationHook, self).setup(args, family, device, timer)
+        self.augment = timer.wrap("augment", family.make_augmenter(args, device))
+
+
+class RADHook(AugmentationHook):
+    """RAD: the learner only sees augmented observations."""
+    def transform_obs(self, obs):
+        return self.augment(obs)
+
+
+class DrACHook(AugmentationHook):
+    """DrAC: regularizes the policy and the value function to agree on augmented observations."""
+    @staticmethod
+    def add_args(parser, family):
+        AugmentationHook.add_args(parser, family)
+        parser.add_argument("--aug-coef", type=float, default=0.1,
+            help="coefficient of the DRAC augment loss")
+
+    def aux_loss(self, agent, obs, actions, newlogprob, newvalue):
+        _, aug_newlogprob, _, aug_newvalue = agent.get_action_and_value(self.augment(obs), actions)
+        action_loss_aug = -aug_newlogprob.mean()
+        value_loss_aug = 0.5 * ((torch.detach(newvalue) - aug_newvalue.view(-1)) ** 2).mean()
+        return (action_loss_aug + value_loss_aug) * self.args.aug_coef
+
+
+class BAEHook(AugmentationHook):
+    """BAE: bootstraps from the average over the values of num_augs augmented views.
+
+    The augmented values are computed with the action at every step, or with
+    --defer-translated-values in chunks over the stored rollout once it is
+    collected.
+    """
+    @staticmethod
+    def add_args(parser, family):
+        AugmentationHook.add_args(parser, family)
+        parser.add_argument("--num-augs", type=int, default=1,
+            help="the number of augmented views used for the value estimates")
+        parser.add_argument("--defer-translated-values", type=lambda x: bool(strtobool(x)), default=False, nargs="?", const=True,
+            help="if toggled, the augmented values are computed after the rollout instead of at every env step")
+        parser.add_argument("--value-chunk-size", type=int, default=2048,
+            help="the number of stored observations per forward pass for the deferred augmented values")
+        if family.name == "procgen":
+            # unused; kept so that the existing command lines still parse
+            parser.add_argument("--n_cluster", type=int, default=3,
+                help="number of cluster to use")
+            parser.add_argument("--stargan_epochs", type=int, default=10,
+                help="number of stargan training epoch/iteration")
+            parser.add_argument("--load_gmm", type=lambda x: bool(strtobool(x)), default=False, nargs="?", const=True,
+                help="Load pretrained gmm for clustering")
+            parser.add_argument("--load_generator", type=lambda x: bool(strtobool(x)), default=False, nargs="?", const=True,
+                help="Load pretrained generator for style transfer")
+
+    def setup(self, args, family, device, timer):
+        super(BAEHook, self).setup(args, family, device, timer)
+        self.value_streams = args.num_augs + 1
+
+    def augment_views(self, obs):
+        # num_augs augmented copies of obs, stacked along the batch dimension
+        return self.augment(obs.repeat((self.args.num_augs,) + (1,) * (obs.dim() - 1)))
+
+    def act(self, policy, obs):
+        if self.args.defer_translated_values:
+            return super(BAEHook, self).act(policy, obs)
+        action, logprob, _, values = policy.get_action_and_values(obs, self.augment_views(obs))
+        return action, logprob, values
+
+    def bootstrap(self, policy, rollout):
+        args = self.args
+        next_values = policy.get_value(torch.cat([rollout.next_obs, self.augment_views(rollout.next_obs)])).reshape(args.num_augs + 1, -1)
+        if args.defer_translated_values:
+            # a few large batches over the stored rollout instead of one small batch per step
+            flat_obs = rollout.obs.reshape((-1,) + rollout.obs.shape[2:])
+            flat_values_translated = rollout.values_all[1:].view(args.num_augs, -1)
+            for start in range(0, len(flat_obs), args.value_chunk_size):
+                chunk = flat_obs[start:start + args.value_chunk_size]
+                flat_values_translated[:, start:start + len(chunk)] = policy.get_value(self.augment_views(chunk)).view(args.num_augs, -1)
+        return next_values
+
+    def advantages(self, rollout, next_values):
+        args = self.args
+        if not args.gae:
+            return super(BAEHook, self).advantages(rollout, next_values[0])
+        # the original and the translated value streams in one pass
+        advantages_all, _ = compute_advantages(rollout.rewards, rollout.values_all, rollout.dones, next_values,
+                                               rollout.next_done, args.gamma, args.gae_lambda)
+        advantages, advantages_translated = advantages_all[0], advantages_all[1:]
+        returns = advantages + rollout.values
+        returns_translated = advantages + rollout.values_all[1:]
+        # Combine
+        returns = (returns + returns_translated.sum(0)) / (args.num_augs + 1)
+        advantages = (advantages + advantages_translated.sum(0)) / (args.num_augs + 1)
+        return advantages, returns
@@ -0,0 +1,107 @@
+import numpy as np
+import torch
+import torch.nn as nn
+
+
+class PPOLearner(object):
+    """The clipped PPO update of the scripts.
+
+    learn() optimizes agent on one flattened batch of the rollout engine;
+    the minibatch observations go through hook.transform_obs() and
+    hook.aux_loss() is added to the loss. log(name, value, global_step)
+    receives the losses of the last minibatch.
+    """
+    def __init__(self, args, agent, optimizer, num_updates, hook, log, timer):
+        self.args = args
+        self.agent = agent
+        self.optimizer = optimizer
+        self.num_updates = num_updates
+        self.hook = hook
+        self.log = log
+        self.timer = timer
+
+    def learn(self, update, global_step, b_obs, b_logprobs, b_actions, b_advantages, b_returns, b_values):
+        args, agent, optimizer, hook, timer = self.args, self.agent, self.optimizer, self.hook, self.timer
+        # Annealing the rate if instructed to do so.
+        if args.anneal_lr:
+            frac = 1.0 - (update - 1.0) / self.num_updates
+            lrnow = frac * args.learning_rate
+            optimizer.param_groups[0]["lr"] = lrnow
+
+        # Optimizing the policy and value network
+        b_inds = np.arange(args.batch_size)
+        clipfracs = []
+        for epoch in range(args.update_epochs):
+            np.random.shuffle(b_inds)
+            for start in range(0, args.batch_size, args.minibatch_size):
+                end = start + args.minibatch_size
+                mb_inds = b_inds[start:end]
+
+                with timer("forward"):
+                    mb_obs, mb_actions = b_obs[mb_inds], b_actions[mb_inds]
+                    _, newlogprob, entropy, newvalue = agent.get_action_and_value(hook.transform_obs(mb_obs), mb_actions)
+                    logratio = newlogprob - b_logprobs[mb_inds]
+                    ratio = logratio.exp()
+
+                    with torch.no_grad():
+                        # calculate approx_kl http://joschu.net/blog/kl-approx.html
+                        old_approx_kl = (-logratio).mean()
+                        approx_kl = ((ratio - 1) - logratio).mean()
+                        clipfracs += [((ratio - 1.0).abs() > args.clip_coef).float().mean().item()]
+
+                    mb_advantages = b_advantages[mb_inds]
+                    if args.norm_adv:
+                        mb_advantages = (mb_advantages - mb_advantages.mean()) / (mb_advantages.std() + 1e-8)
+
+                    # Policy loss
+                    pg_loss1 = -mb_advantages * ratio
+                    pg_loss2 = -mb_advantages * torch.clamp(ratio, 1 - args.clip_coef, 1 + args.clip_coef)
+                    pg_loss = torch.max(pg_loss1, pg_loss2).mean()
+
+                    # Value loss
+                    newvalue = newvalue.view(-1)
+                    if args.clip_vloss:
+                        v_loss_unclipped = (newvalue - b_returns[mb_inds]) ** 2
+                        v_clipped = b_values[mb_inds] + torch.clamp(
+                            newvalue - b_values[mb_inds],
+                            -args.clip_coef,
+                            args.clip_coef,
+                        )
+                        v_loss_clipped = (v_clipped - b_returns[mb_inds]) ** 2
+                        v_loss_max = torch.max(v_loss_unclipped, v_loss_clipped)
+                        v_loss = 0.5 * v_loss_max.mean()
+                    else:
+                        v_loss = 0.5 * ((newvalue - b_returns[mb_inds]) ** 2).mean()
+
+                    entropy_loss = entropy.mean()
+                    loss = pg_loss - args.ent_coef * entropy_loss + v_loss * args.vf_coef
+                    aux_loss = hook.aux_loss(agent, mb_obs, mb_actions, newlogprob, newvalue)
+                    if aux_loss is not None:
+                        loss = loss + aux_loss
+
+                with timer("backward"):
+                    optimizer.zero_grad()
+                    loss.backward()
+                with timer("optimizer"):
+                    nn.utils.clip_grad_norm_(agent.parameters(), args.max_grad_norm)
+                    optimizer.step()
+
+            if args.target_kl is not None:
+                if approx_kl > args.target_kl:
+                    break
+
+        y_pred, y_true = b_values.cpu().numpy(), b_returns.cpu().numpy()
+        var_y = np.var(y_true)
+        explained_var = np.nan if var_y == 0 else 1 - np.var(y_true - y_pred) / var_y
+
+        # TRY NOT TO MODIFY: record rewards for plotting purposes
+        self.log("charts/learning_rate", optimizer.param_groups[0]["lr"], global_step)
+        self.log("losses/value_loss", v_loss.item(), global_step)
+        self.log("losses/policy_loss", pg_loss.item(), global_step)
+        self.log("losses/entropy", entropy_loss.item(), global_step)
+        self.log("losses/old_approx_kl", old_approx_kl.item(), global_step)
+        self.log("losses/approx_kl", approx_kl.item(), global_step)
+        self.log("losses/clipfrac", np.mean(clipfracs), global_step)
+        self.log("losses/explained_variance", explained_var, global_step)
+        if aux_loss is not None:
+            self.log("losses/aux_loss", aux_loss.item(), global_step)
@@ -0,0 +1,62 @@
+import copy
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+
+class Pipeline(object):
+    """Optimizes agent on a worker thread while the next rollout is collected.
+
+    policy is a copy of agent for the rollout to act with. submit() waits for
+    the previous update, loads its weights into policy and starts learn on a
+    copy of the batch, so policy is at most one update behind agent. On CUDA
+    the rollout runs on stream, its own stream (use it with
+    torch.cuda.stream(pipeline.stream)), and the learner on the default
+    stream: the action readbacks of the rollout wait for the rollout's own
+    kernels only. The streams wait for each other only where submit() hands
+    over the batch and the weights. On the CPU stream is None. wait() blocks
+    until the last submitted update is done, close() also stops the worker.
+    """
+    def __init__(self, agent, learn, device):
+        self.agent = agent
+        self.policy = copy.deepcopy(agent)
+        self._learn = learn
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._learner = None
+        self._version = 0
+        self.stream = None
+        device = torch.device(device)
+        if device.type == "cuda":
+            self._learner_stream = torch.cuda.default_stream(device)
+            self.stream = torch.cuda.Stream(device)
+            self.stream.wait_stream(torch.cuda.current_stream(device))
+
+    def submit(self, update, global_step, batch):
+        # returns the policy lag of the rollout that collected batch
+        with torch.cuda.stream(self.stream):
+            batch = [b.clone() for b in batch]
+            if self._learner is not None:
+                self._learner.result()
+            if self.stream is not None:
+                # the weights are copied once the learner's kernels are done, and
+                # the learner starts once the batch and the weights are copied
+                self.stream.wait_stream(self._learner_stream)
+            policy_lag = update - 1 - self._version
+            self.policy.load_state_dict(self.agent.state_dict())
+            self._version = update - 1
+            if self.stream is not None:
+                self._learner_stream.wait_stream(self.stream)
+                for b in batch:
+                    b.record_stream(self._learner_stream)
+        self._learner = self._executor.submit(self._learn, update, global_step, *batch)
+        return policy_lag
+
+    def wait(self):
+        if self._learner is not None:
+            self._learner.result()
+        if self.stream is not None:
+            torch.cuda.current_stream(self.stream.device).wait_stream(self._learner_stream)
+
+    def close(self):
+        self.wait()
+        self._executor.shutdown()
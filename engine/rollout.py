@@ -0,0 +1,75 @@
+import gym
+import torch
+
+from episode_stats import EpisodeTracker
+from rollout_io import RolloutIO
+
+
+class RolloutEngine(object):
+    """Collects args.num_steps steps of envs into preallocated storage.
+
+    The storage is laid out (num_steps, num_envs, ...) on device; values_all
+    holds the hook.value_streams value streams and values is stream 0.
+    collect() runs the policy for one rollout, advantages() bootstraps from
+    the last observation and batch() flattens everything for the learner.
+    Finished episodes are counted in episodes.
+    """
+    def __init__(self, args, envs, obs_dtype, device, hook, timer):
+        self.envs = envs
+        self.hook = hook
+        self.timer = timer
+        self.num_steps, self.num_envs = args.num_steps, args.num_envs
+        self.obs_shape = envs.single_observation_space.shape
+        self.action_shape = envs.single_action_space.shape
+        self.discrete = isinstance(envs.single_action_space, gym.spaces.Discrete)
+
+        self.obs = torch.zeros((self.num_steps, self.num_envs) + self.obs_shape, dtype=obs_dtype).to(device)
+        self.actions = torch.zeros((self.num_steps, self.num_envs) + self.action_shape).to(device)
+        self.logprobs = torch.zeros((self.num_steps, self.num_envs)).to(device)
+        self.rewards = torch.zeros((self.num_steps, self.num_envs)).to(device)
+        self.dones = torch.zeros((self.num_steps, self.num_envs)).to(device)
+        self.values_all = torch.zeros((hook.value_streams, self.num_steps, self.num_envs)).to(device)
+        self.values = self.values_all[0]
+
+        self.io = RolloutIO(self.num_envs, self.obs_shape, obs_dtype, device, timer)
+        self.next_obs = self.io.reset(envs)
+        self.next_done = self.io.next_done
+        self.episodes = EpisodeTracker(envs)
+
+    def collect(self, policy):
+        # returns the number of env steps taken
+        for step in range(0, self.num_steps):
+            self.obs[step] = self.next_obs
+            self.dones[step] = self.next_done
+
+            # ALGO LOGIC: action logic
+            with torch.no_grad(), self.timer("inference"):
+                action, logprob, values = self.hook.act(policy, self.next_obs)
+                self.values_all[:len(values), step] = values
+            self.actions[step] = action
+            self.logprobs[step] = logprob
+
+            # TRY NOT TO MODIFY: execute the game and log data.
+            self.next_obs, self.next_done, info = self.io.step(self.envs, action, self.rewards[step])
+
+            self.episodes.update(self.io.dones, info)
+        return self.num_steps * self.num_envs
+
+    def advantages(self, policy):
+        # bootstrap value if not done
+        with torch.no_grad(), self.timer("gae"):
+            return self.hook.advantages(self, self.hook.bootstrap(policy, self))
+
+    def batch(self, advantages, returns):
+        # flatten the batch
+        b_actions = self.actions.reshape((-1,) + self.action_shape)
+        if self.discrete:
+            b_actions = b_actions.long()
+        return (
+            self.obs.reshape((-1,) + self.obs_shape),
+            self.logprobs.reshape(-1),
+            b_actions,
+            advantages.reshape(-1),
+            returns.reshape(-1),
+            self.values.reshape(-1),
+        )
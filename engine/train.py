@@ -0,0 +1,155 @@
+import functools
+import os
+import random
+import time
+
+import numpy as np
+import torch
+import torch.optim as optim
+from torch.utils.tensorboard import SummaryWriter
+
+from engine.hooks import Hook
+from engine.learner import PPOLearner
+from engine.pipeline import Pipeline
+from engine.rollout import RolloutEngine
+from evaluator import AsyncEvaluator, evaluate
+from metrics import MetricsWriter
+from profiling import UpdateProfiler
+from rollout_io import RolloutIO
+from timers import PhaseTimer
+
+
+def train(args, family, hook=None, result_dir="./", metrics_suffix=""):
+    """Trains family.agent_class with PPO, extended by hook (plain PPO if None).
+
+    Everything is logged to tensorboard under result_dir and, for the
+    commands lines with --metrics-format, to a metrics file whose name ends
+    with metrics_suffix.
+    """
+    hook = hook or Hook()
+    run_name = family.run_name(args)
+    metrics = None
+    if getattr(args, "metrics_format", None):
+        metrics = MetricsWriter(os.path.join(result_dir, run_name) + metrics_suffix, args.metrics_format)
+    if args.track:
+        import wandb
+
+        wandb.init(
+            project=args.wandb_project_name,
+            dir=result_dir + family.wandb_dir,
+            entity=args.wandb_entity,
+            sync_tensorboard=True,
+            config=vars(args),
+            name=run_name,
+            monitor_gym=True,
+            save_code=True,
+        )
+    writer = SummaryWriter(f"{result_dir}{family.tb_dir}/{run_name}")
+    writer.add_text(
+        "hyperparameters",
+        "|param|value|\n|-|-|\n%s" % ("\n".join([f"|{key}|{value}|" for key, value in vars(args).items()])),
+    )
+
+    def log(name, value, global_step):
+        writer.add_scalar(name, value, global_step)
+        if metrics is not None:
+            metrics.add(name, value, global_step)
+
+    # TRY NOT TO MODIFY: seeding
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    torch.manual_seed(args.seed)
+    torch.backends.cudnn.deterministic = args.torch_deterministic
+
+    device = torch.device("cuda" if torch.cuda.is_available() and args.cuda else "cpu")
+    timer = PhaseTimer(args.phase_timers, device, labels=bool(args.profile_updates) and args.profile_backend == "torch")
+
+    # env setup
+    envs = family.make_envs(args, run_name, result_dir)
+    evaluator = test_envs = None
+    if family.make_test_envs is not None:
+        if args.async_eval:
+            evaluator = AsyncEvaluator(functools.partial(family.make_test_envs, args), family.agent_class, args.num_envs,
+                                       args.eval_steps, args.eval_episodes, args.eval_greedy, args.eval_max_steps,
+                                       family.obs_dtype)
+        else:
+            test_envs = family.make_test_envs(args)
+            test_io = RolloutIO(args.num_envs, test_envs.single_observation_space.shape, family.obs_dtype, device)
+            test_reset = True
+
+    agent = family.agent_class(envs).to(device)
+    optimizer = optim.Adam(agent.parameters(), lr=args.learning_rate, eps=1e-5)
+    hook.setup(args, family, device, timer)
+
+    def log_test_episodes(test_episodes):
+        for test_step, test_return, test_length in test_episodes:
+            print(f"global_step={test_step}, test_episodic_return={test_return}")
+            log("charts/test_episodic_return", test_return, test_step)
+            log("charts/test_episodic_length", test_length, test_step)
+
+    # TRY NOT TO MODIFY: start the game
+    global_step = 0
+    start_time = time.time()
+    rollout = RolloutEngine(args, envs, family.obs_dtype, device, hook, timer)
+    num_updates = args.total_timesteps // args.batch_size
+    learn = timer.wrap("learn", PPOLearner(args, agent, optimizer, num_updates, hook, log, timer).learn)
+    # the learner optimizes its own copy of the batch while the next rollout is
+    # collected by the policy snapshot, which is at most one update behind
+    pipeline = Pipeline(agent, learn, device) if args.pipeline else None
+    policy = agent if pipeline is None else pipeline.policy
+    rollout_stream = None if pipeline is None else pipeline.stream
+    profiler = UpdateProfiler(args.profile_updates, args.profile_backend, f"{result_dir}profiles/{run_name}", device)
+    next_eval_step = 0
+
+    # the main thread runs the rollout, the evaluation and the logging on the
+    # pipeline's stream, if any
+    with torch.cuda.stream(rollout_stream):
+        for update in range(1, num_updates + 1):
+            profiler.begin(update)
+            global_step += rollout.collect(policy)
+            advantages, returns = rollout.advantages(policy)
+            batch = rollout.batch(advantages, returns)
+            if pipeline is not None:
+                policy_lag = pipeline.submit(update, global_step, batch)
+            else:
+                policy_lag = 0
+                learn(update, global_step, *batch)
+            with timer("logging"):
+                episode_summary = rollout.episodes.summary()
+                if episode_summary:
+                    print(f"global_step={global_step}, episodic_return={episode_summary['episodic_return']}")
+                for name, value in episode_summary.items():
+                    log(f"charts/{name}", value, global_step)
+                log("charts/policy_lag", policy_lag, global_step)
+                print("SPS:", int(global_step / (time.time() - start_time)))
+                log("charts/SPS", int(global_step / (time.time() - start_time)), global_step)
+
+            # generalization test
+            with timer("eval"):
+                if evaluator is not None:
+                    log_test_episodes(evaluator.results())
+                if family.make_test_envs is not None and global_step >= next_eval_step:
+                    next_eval_step = global_step + args.eval_interval
+                    if evaluator is not None:
+                        evaluator.submit(global_step, policy)
+                    else:
+                        test_episodes = evaluate(policy, test_envs, test_io, args.eval_steps, args.eval_episodes,
+                                                 args.eval_greedy, test_reset, args.eval_max_steps)
+                        test_reset = False
+                        log_test_episodes([(global_step,) + episode for episode in test_episodes])
+
+            for name, value in timer.summary(args.batch_size).items():
+                log(f"timers/{name}", value, global_step)
+            profiler.end(update)
+
+    if pipeline is not None:
+        pipeline.close()
+    profiler.close()
+    envs.close()
+    if evaluator is not None:
+        log_test_episodes(evaluator.close())
+    elif test_envs is not None:
+        test_envs.close()
+    if metrics is not None:
+        metrics.close()
+    writer.close()
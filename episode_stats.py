@@ -0,0 +1,102 @@
+import time
+
+import gym
+import numpy as np
+
+
+class VectorEpisodeStatistics(gym.wrappers.RecordEpisodeStatistics):
+    """RecordEpisodeStatistics for vector envs without the per-env loop.
+
+    Returns and lengths are accumulated as arrays and only the envs that are
+    done get an info["episode"] entry, so the cost of a step no longer grows
+    with num_envs. The finished episodes of the last step are also available
+    as finished_envs, finished_returns and finished_lengths arrays.
+    """
+    def __init__(self, env, deque_size=100):
+        super(VectorEpisodeStatistics, self).__init__(env, deque_size)
+        assert self.is_vector_env, "VectorEpisodeStatistics needs a vector env"
+        self.finished_envs = np.zeros(0, dtype=np.int64)
+        self.finished_returns = np.zeros(0, dtype=np.float32)
+        self.finished_lengths = np.zeros(0, dtype=np.int32)
+
+    def step(self, action):
+        observations, rewards, dones, infos = self.env.step(action)
+        self.episode_returns += rewards
+        self.episode_lengths += 1
+        self.finished_envs = np.flatnonzero(dones)
+        self.finished_returns = self.episode_returns[self.finished_envs]
+        self.finished_lengths = self.episode_lengths[self.finished_envs]
+        if len(self.finished_envs):
+            infos = list(infos)
+            t = round(time.perf_counter() - self.t0, 6)
+            for i, episode_return, episode_length in zip(self.finished_envs, self.finished_returns, self.finished_lengths):
+                infos[i] = dict(infos[i], episode={"r": episode_return, "l": episode_length, "t": t})
+            infos = tuple(infos)
+            self.return_queue.extend(self.finished_returns)
+            self.length_queue.extend(self.finished_lengths)
+            self.episode_count += len(self.finished_envs)
+            self.episode_returns[self.finished_envs] = 0
+            self.episode_lengths[self.finished_envs] = 0
+        return observations, rewards, dones, infos
+
+
+def episode_statistics(env):
+    # the VectorEpisodeStatistics among the wrappers of env, or None
+    while isinstance(env, gym.Wrapper):
+        if isinstance(env, VectorEpisodeStatistics):
+            return env
+        env = env.env
+    return None
+
+
+def finished_episodes(dones, infos, stats=None):
+    # (env indices, returns, lengths) of the episodes recorded by
+    # RecordEpisodeStatistics in this step; with the VectorEpisodeStatistics
+    # stats of the env its arrays are returned, otherwise only the done envs
+    # are looked at
+    if stats is not None:
+        return (stats.finished_envs, np.asarray(stats.finished_returns, dtype=np.float64),
+                np.asarray(stats.finished_lengths, dtype=np.int64))
+    envs = np.flatnonzero(dones)
+    envs = np.array([i for i in envs if "episode" in infos[i]], dtype=np.int64)
+    returns = np.array([infos[i]["episode"]["r"] for i in envs], dtype=np.float64)
+    lengths = np.array([infos[i]["episode"]["l"] for i in envs], dtype=np.int64)
+    return envs, returns, lengths
+
+
+class EpisodeTracker(object):
+    """Collects the finished episodes of a rollout and summarizes them.
+
+    update() takes the dones and infos of a step of envs, read from its
+    VectorEpisodeStatistics if it has one (see finished_episodes). summary()
+    returns the mean (under the usual charts/episodic_return and
+    charts/episodic_length names), median, min and max of the returns and
+    lengths and the episode count since the previous summary, or {} when no
+    episode finished.
+    """
+    def __init__(self, envs=None):
+        self._stats = episode_statistics(envs)
+        self._returns = []
+        self._lengths = []
+
+    def update(self, dones, infos):
+        envs, returns, lengths = finished_episodes(dones, infos, self._stats)
+        if len(envs):
+            self._returns.append(returns)
+            self._lengths.append(lengths)
+        return envs, returns, lengths
+
+    def summary(self):
+        if not self._returns:
+            return {}
+        returns = np.concatenate(self._returns)
+        lengths = np.concatenate(self._lengths)
+        self._returns, self._lengths = [], []
+        summary = {}
+        for name, values in (("episodic_return", returns), ("episodic_length", lengths)):
+            summary[name] = float(np.mean(values))
+            summary[name + "_median"] = float(np.median(values))
+            summary[name + "_min"] = float(np.min(values))
+            summary[name + "_max"] = float(np.max(values))
+        summary["episodes"] = len(returns)
+        return summary
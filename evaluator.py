@@ -0,0 +1,126 @@
+import multiprocessing as mp
+import queue
+
+import numpy as np
+import torch
+from gym.vector.utils import CloudpickleWrapper
+
+from episode_stats import episode_statistics, finished_episodes
+from rollout_io import RolloutIO
+
+
+def evaluate(agent, envs, rollout_io, num_steps, num_episodes=0, greedy=False, reset=True, max_steps=None):
+    # num_steps of envs, acting with agent.get_action. With reset the envs
+    # start from a fresh reset, otherwise they continue from
+    # rollout_io.next_obs where the previous evaluation stopped: Procgen
+    # ignores an early reset, which would only clear the episode statistics.
+    # Returns the (return, length) of every episode played from its first
+    # step by agent: those that start within the num_steps, plus those that
+    # had just started when the previous evaluation stopped. Past num_steps
+    # the envs are stepped on until these episodes have finished, up to
+    # max_steps (default: 4 * num_steps) in total; with num_episodes the
+    # rollout stops once that many episodes have finished.
+    max_steps = max_steps or 4 * num_steps
+    episodes = []
+    stats = episode_statistics(envs)
+    # whether the episode in progress in each env is reported when it finishes
+    started = np.full(rollout_io.dones.shape, reset) | (rollout_io.dones > 0)
+    next_obs = rollout_io.reset(envs) if reset else rollout_io.next_obs
+    for step in range(0, max_steps):
+        if step >= num_steps and not started.any():
+            break
+        with torch.no_grad():
+            action = agent.get_action(next_obs, greedy)
+        next_obs, _, info = rollout_io.step(envs, action)
+
+        finished, returns, lengths = finished_episodes(rollout_io.dones, info, stats)
+        complete = started[finished]
+        episodes += zip(returns[complete].tolist(), lengths[complete].tolist())
+        started[rollout_io.dones > 0] = step + 1 < num_steps
+        if num_episodes and len(episodes) >= num_episodes:
+            return episodes[:num_episodes]
+    return episodes
+
+
+def _worker(make_envs, make_agent, num_envs, num_steps, num_episodes, greedy, max_steps, obs_dtype, num_threads,
+            snapshots, results):
+    torch.set_num_threads(num_threads)
+    envs = make_envs.fn()
+    agent = make_agent.fn(envs)
+    rollout_io = RolloutIO(num_envs, envs.single_observation_space.shape, obs_dtype)
+    reset = True
+    try:
+        while True:
+            snapshot = snapshots.get()
+            if snapshot is None:
+                break
+            global_step, state_dict = snapshot
+            agent.load_state_dict(state_dict)
+            episodes = evaluate(agent, envs, rollout_io, num_steps, num_episodes, greedy, reset, max_steps)
+            reset = False
+            results.put([(global_step,) + episode for episode in episodes])
+    finally:
+        envs.close()
+
+
+class AsyncEvaluator(object):
+    """Runs the evaluation rollouts in a separate process on the CPU.
+
+    make_envs() builds the test envs and make_agent(envs) the agent inside
+    the worker; num_steps, num_episodes, greedy and max_steps are passed on
+    to evaluate(). submit() hands over a copy of the current weights; while the
+    worker is busy only the latest snapshot is kept. results() returns the
+    (global_step, episodic_return, episodic_length) tuples finished so far,
+    global_step being the one passed with the evaluated snapshot.
+    """
+    def __init__(self, make_envs, make_agent, num_envs, num_steps, num_episodes=0, greedy=False, max_steps=None,
+                 obs_dtype=torch.uint8, num_threads=1, context="spawn"):
+        ctx = mp.get_context(context)
+        self._snapshots = ctx.Queue(maxsize=1)
+        self._results = ctx.Queue()
+        self._process = ctx.Process(
+            target=_worker,
+            name=f"Worker<{type(self).__name__}>",
+            args=(CloudpickleWrapper(make_envs), CloudpickleWrapper(make_agent), num_envs, num_steps, num_episodes,
+                  greedy, max_steps, obs_dtype, num_threads, self._snapshots, self._results),
+        )
+        self._process.daemon = True
+        self._process.start()
+
+    def submit(self, global_step, agent):
+        state_dict = {k: v.detach().to("cpu", copy=True) for k, v in agent.state_dict().items()}
+        try:
+            self._snapshots.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self._snapshots.put_nowait((global_step, state_dict))
+        except queue.Full:
+            pass
+
+    def results(self):
+        if self._process.exitcode:
+            raise RuntimeError(f"The evaluator process exited with code {self._process.exitcode}.")
+        return self._drain()
+
+    def close(self):
+        # evaluates the pending snapshot, if any, and returns the remaining results
+        self._snapshots.put(None)
+        results = []
+        while self._process.is_alive():
+            results += self._drain(timeout=0.1)
+        self._process.join()
+        return results + self._drain()
+
+    def _drain(self, timeout=None):
+        results = []
+        try:
+            while True:
+                if timeout is None:
+                    results += self._results.get_nowait()
+                else:
+                    results += self._results.get(timeout=timeout)
+                    timeout = None
+        except queue.Empty:
+            pass
+        return results
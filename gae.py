@@ -0,0 +1,80 @@
+import numpy as np
+import torch
+
+# Advantage estimation shared by the PPO scripts. The inputs follow the layout
+# of the rollout storage: rewards and dones are num_steps x num_envs, next_done
+# is num_envs. values may carry extra leading axes (e.g. the original and the
+# augmented value streams of BAE stacked as K x num_steps x num_envs), in which
+# case next_value has the same leading axes followed by num_envs. All streams
+# are computed together and the results have the shape of values.
+# A reverse loop over the steps updates all streams and envs at once. Tensors
+# on the CPU and NumPy arrays go through the NumPy loop, tensors on other
+# devices through the torch one; both give the same numbers as the per-script
+# loops they replace.
+
+
+def _reverse_scan(x, coeff, init):
+    # out[:, t] = x[:, t] + coeff[t] * out[:, t + 1], with out[:, num_steps] = init
+    out = torch.empty_like(x)
+    carry = init
+    for t in reversed(range(x.shape[1])):
+        carry = x[:, t] + coeff[t] * carry
+        out[:, t] = carry
+    return out
+
+
+def _compute_torch(rewards, values, dones, next_value, next_done, gamma, gae_lambda, gae):
+    nextnonterminal = 1.0 - torch.cat([dones[1:], next_done.unsqueeze(0)])
+    if gae:
+        nextvalues = torch.cat([values[:, 1:], next_value.unsqueeze(1)], dim=1)
+        deltas = rewards + gamma * nextvalues * nextnonterminal - values
+        advantages = _reverse_scan(deltas, gamma * gae_lambda * nextnonterminal, torch.zeros_like(next_value))
+        returns = advantages + values
+    else:
+        returns = _reverse_scan(rewards.expand_as(values), gamma * nextnonterminal, next_value)
+        advantages = returns - values
+    return advantages, returns
+
+
+def _reverse_scan_numpy(x, coeff, init):
+    out = np.empty_like(x)
+    carry = init
+    for t in reversed(range(x.shape[1])):
+        carry = x[:, t] + coeff[t] * carry
+        out[:, t] = carry
+    return out
+
+
+def _compute_numpy(rewards, values, dones, next_value, next_done, gamma, gae_lambda, gae):
+    nextnonterminal = 1.0 - np.concatenate([dones[1:], next_done[None]])
+    if gae:
+        nextvalues = np.concatenate([values[:, 1:], next_value[:, None]], axis=1)
+        deltas = rewards + gamma * nextvalues * nextnonterminal - values
+        advantages = _reverse_scan_numpy(deltas, gamma * gae_lambda * nextnonterminal, np.zeros_like(next_value))
+        returns = advantages + values
+    else:
+        returns = _reverse_scan_numpy(np.broadcast_to(rewards, values.shape), gamma * nextnonterminal, next_value)
+        advantages = returns - values
+    return advantages, returns
+
+
+def compute_advantages(rewards, values, dones, next_value, next_done, gamma, gae_lambda, gae=True):
+    """Returns (advantages, returns) for one or several stacked value streams.
+
+    With gae=False the returns are the discounted rewards bootstrapped from
+    next_value and the advantages are returns - values.
+    """
+    num_steps, num_envs = rewards.shape
+    streams = values.reshape(-1, num_steps, num_envs)
+    next_streams = next_value.reshape(-1, num_envs)
+    if isinstance(values, torch.Tensor) and values.device.type == "cpu":
+        # the NumPy loop on views of the same memory has less overhead per step
+        advantages, returns = _compute_numpy(rewards.numpy(), streams.numpy(), dones.numpy(), next_streams.numpy(),
+                                             next_done.numpy(), gamma, gae_lambda, gae)
+        advantages, returns = torch.from_numpy(advantages), torch.from_numpy(returns)
+    elif isinstance(values, torch.Tensor):
+        advantages, returns = _compute_torch(rewards, streams, dones, next_streams, next_done, gamma, gae_lambda, gae)
+    else:
+        advantages, returns = _compute_numpy(np.asarray(rewards), streams, np.asarray(dones), next_streams,
+                                             np.asarray(next_done), gamma, gae_lambda, gae)
+    return advantages.reshape(values.shape), returns.reshape(values.shape)
@@ -0,0 +1,103 @@
+import atexit
+import os
+import signal
+import threading
+
+import numpy as np
+
+FORMATS = ("txt", "csv", "npz")
+
+
+class MetricsWriter(object):
+    """Collects scalars in memory and writes them to disk in bulk.
+
+    add() only appends to a buffer. A background thread flushes it once
+    max_buffer rows are pending or every flush_interval seconds, and close()
+    flushes the rest; it is registered with atexit and runs on SIGTERM too,
+    where the rest is flushed without waiting for the background thread.
+    Each format in formats writes path + "." + format:
+      txt  "attribute step value" lines, as written by the old logging()
+      csv  attribute,step,value rows under a header
+      npz  columnar arrays (names, attribute index, step, value), written on close
+    """
+    def __init__(self, path, formats=("txt",), max_buffer=1000, flush_interval=10.0):
+        for fmt in formats:
+            assert fmt in FORMATS, f"unknown metrics format {fmt}, expected one of {FORMATS}"
+        self.path = path
+        self.formats = tuple(formats)
+        self.max_buffer = max_buffer
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.RLock()
+        self._write_lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._names = {}
+        self._columns = ([], [], [])
+        if "csv" in self.formats and not os.path.exists(path + ".csv"):
+            with open(path + ".csv", "w") as f:
+                f.write("attribute,step,value\n")
+
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        if threading.current_thread() is threading.main_thread():
+            self._previous_handler = signal.signal(signal.SIGTERM, self._on_signal)
+
+    def add(self, attribute, value, step):
+        with self._lock:
+            self._buffer.append((attribute, step, value))
+            if len(self._buffer) >= self.max_buffer:
+                self._wakeup.set()
+
+    def flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+        with self._write_lock:
+            if "txt" in self.formats:
+                with open(self.path + ".txt", "a") as f:
+                    f.write("".join(f"{attribute} {step} {value}\n" for attribute, step, value in rows))
+            if "csv" in self.formats:
+                with open(self.path + ".csv", "a") as f:
+                    f.write("".join(f"{attribute},{step},{value}\n" for attribute, step, value in rows))
+            if "npz" in self.formats:
+                for attribute, step, value in rows:
+                    self._columns[0].append(self._names.setdefault(attribute, len(self._names)))
+                    self._columns[1].append(step)
+                    self._columns[2].append(value)
+
+    def close(self):
+        self._close(join=True)
+
+    def _close(self, join):
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        if join:
+            self._thread.join()
+        self.flush()
+        if "npz" in self.formats:
+            np.savez(self.path + ".npz",
+                     names=np.array(list(self._names)),
+                     attribute=np.array(self._columns[0], dtype=np.int32),
+                     step=np.array(self._columns[1], dtype=np.int64),
+                     value=np.array(self._columns[2], dtype=np.float64))
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _on_signal(self, signum, frame):
+        # the main thread may have been interrupted inside add() holding _lock, which
+        # the background thread would then wait for forever: flush here, where the
+        # lock is re-entrant, instead of joining it
+        self._close(join=False)
+        if callable(self._previous_handler):
+            self._previous_handler(signum, frame)
+        else:
+            raise SystemExit(128 + signum)
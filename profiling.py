@@ -0,0 +1,104 @@
+import cProfile
+import os
+import shutil
+import signal
+import subprocess
+
+import torch
+
+BACKENDS = ("torch", "cprofile", "pyspy")
+
+
+def parse_windows(spec):
+    # "10:12,50" -> [(10, 12), (50, 50)], both ends inclusive
+    windows = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition(":")
+        first, last = int(first), int(last or first)
+        assert 1 <= first <= last, f"invalid profile window {part}"
+        windows.append((first, last))
+    return windows
+
+
+class UpdateProfiler(object):
+    """Profiles chosen update iterations of the training loop.
+
+    windows is a spec like "10:12" (updates 10 to 12, both included),
+    "10" or "10:12,50:51". Call begin(update) at the top of every update
+    and end(update) at the bottom. Every window writes one file to out_dir:
+      torch     Chrome trace of torch.profiler, updates_<first>-<last>.json;
+                the PhaseTimer phases show up as record_function ranges
+      cprofile  pstats of cProfile, updates_<first>-<last>.pstats
+      pyspy     speedscope profile of a `py-spy record` attached to this
+                process, updates_<first>-<last>.speedscope.json
+    cprofile only sees the main thread, so in the pipelined mode the
+    learner is missing from its profiles.
+    """
+    def __init__(self, windows, backend="torch", out_dir="profiles", device="cpu"):
+        assert backend in BACKENDS, f"unknown profile backend {backend}, expected one of {BACKENDS}"
+        self.windows = parse_windows(windows)
+        self.backend = backend
+        self.out_dir = out_dir
+        self.device = torch.device(device)
+        self._window = None
+        self._profiler = None
+        if self.windows and backend == "pyspy":
+            assert shutil.which("py-spy"), "the pyspy backend needs py-spy on the PATH"
+
+    @property
+    def active(self):
+        return self._window is not None
+
+    def begin(self, update):
+        if self._window is not None:
+            return
+        for window in self.windows:
+            if window[0] == update:
+                self._start(window)
+                return
+
+    def end(self, update):
+        if self._window is not None and self._window[1] == update:
+            self._stop()
+
+    def close(self):
+        if self._window is not None:
+            self._stop()
+
+    def _path(self, suffix):
+        os.makedirs(self.out_dir, exist_ok=True)
+        return os.path.join(self.out_dir, "updates_{}-{}{}".format(*self._window, suffix))
+
+    def _start(self, window):
+        self._window = window
+        if self.backend == "torch":
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if self.device.type == "cuda":
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self._profiler = torch.profiler.profile(activities=activities)
+            self._profiler.__enter__()
+        elif self.backend == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = subprocess.Popen(
+                ["py-spy", "record", "--pid", str(os.getpid()), "--threads", "--format", "speedscope",
+                 "--output", self._path(".speedscope.json")],
+                stdout=subprocess.DEVNULL,
+            )
+
+    def _stop(self):
+        if self.backend == "torch":
+            self._profiler.__exit__(None, None, None)
+            self._profiler.export_chrome_trace(self._path(".json"))
+        elif self.backend == "cprofile":
+            self._profiler.disable()
+            self._profiler.dump_stats(self._path(".pstats"))
+        else:
+            # py-spy writes its output once interrupted
+            self._profiler.send_signal(signal.SIGINT)
+            self._profiler.wait()
+        self._window, self._profiler = None, None
@@ -0,0 +1,73 @@
+import numpy as np
+import torch
+
+from timers import PhaseTimer
+
+
+class RolloutIO(object):
+    """Moves env outputs to the rollout device and actions back to the envs.
+
+    All buffers are allocated once. On CUDA the env outputs are written into
+    pinned host buffers and copied to the device without blocking, and the
+    actions are read back through one pinned buffer, waiting on an event
+    recorded after the copy instead of on the whole stream. The array handed
+    to envs.step is overwritten by the following step. On the CPU the env
+    outputs are written straight into the returned tensors.
+    The returned next_obs and next_done are overwritten by the next call.
+    dones is a NumPy view of the done flags of the last step on the host.
+    With a PhaseTimer, step() times the env step and the transfers as the
+    "env_step" and "transfer" phases.
+    """
+    def __init__(self, num_envs, obs_shape, obs_dtype=torch.float32, device='cpu', timer=None):
+        self.device = torch.device(device)
+        pin = self.device.type == 'cuda'
+        self.next_obs = torch.zeros((num_envs,) + tuple(obs_shape), dtype=obs_dtype, device=self.device)
+        self.next_done = torch.zeros(num_envs, device=self.device)
+        if pin:
+            self._host_obs = torch.zeros(self.next_obs.shape, dtype=obs_dtype, pin_memory=True)
+            self._host_reward = torch.zeros(num_envs, pin_memory=True)
+            self._host_done = torch.zeros(num_envs, pin_memory=True)
+        else:
+            self._host_obs = self.next_obs
+            self._host_reward = torch.zeros(num_envs)
+            self._host_done = self.next_done
+        self.dones = self._host_done.numpy()
+        self._pin = pin
+        self.timer = timer or PhaseTimer()
+        self._host_action = None
+        self._action_copied = torch.cuda.Event() if pin else None
+
+    def reset(self, envs):
+        if self._pin:
+            torch.cuda.current_stream(self.device).synchronize()
+        self._put(self._host_obs, envs.reset(), self.next_obs)
+        self.next_done.zero_()
+        return self.next_obs
+
+    def step(self, envs, action, reward_out=None):
+        with self.timer("transfer"):
+            host_action = self.actions_to_numpy(action)
+        with self.timer("env_step"):
+            next_obs, reward, done, info = envs.step(host_action)
+        with self.timer("transfer"):
+            self._put(self._host_obs, next_obs, self.next_obs)
+            self._put(self._host_done, done, self.next_done)
+            if reward_out is not None:
+                self._put(self._host_reward, reward, reward_out)
+        return self.next_obs, self.next_done, info
+
+    def actions_to_numpy(self, action):
+        if self._host_action is None:
+            self._host_action = torch.zeros(action.shape, dtype=action.dtype, pin_memory=self._pin)
+        self._host_action.copy_(action, non_blocking=self._pin)
+        if self._pin:
+            self._action_copied.record(torch.cuda.current_stream(self.device))
+            self._action_copied.synchronize()
+        return self._host_action.numpy()
+
+    def _put(self, host, value, out):
+        # the previous non-blocking copy out of host has finished by now: it
+        # was queued before the action readback of this step, which was waited on
+        np.copyto(host.numpy(), np.reshape(value, host.shape), casting='unsafe')
+        if out is not host:
+            out.copy_(host, non_blocking=self._pin)
@@ -0,0 +1,131 @@
+import random
+
+import numpy as np
+import pytest
+import torch
+
+import data_augs_procgen
+import data_augs_procgen_torch
+
+BATCH_SIZE = 16
+
+
+def _images(seed, shape=(BATCH_SIZE, 64, 64, 3)):
+    return np.random.RandomState(seed).randint(0, 256, size=shape).astype(np.uint8)
+
+
+def _augmentations(name, seed, **kwargs):
+    # the NumPy and torch augmentation with the same random parameters
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    np_aug = getattr(data_augs_procgen, name)(BATCH_SIZE, **kwargs)
+    torch_aug = getattr(data_augs_procgen_torch, name)(BATCH_SIZE, **kwargs)
+    for param in ("w1", "h1", "random_inds", "rand_box"):
+        if hasattr(np_aug, param):
+            setattr(torch_aug, param, torch.as_tensor(np.copy(getattr(np_aug, param))))
+    return np_aug, torch_aug
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("name", ["Cutout", "Cutout_Color", "Rand_Flip", "Rand_Rotate", "RandGray"])
+def test_matches_numpy(name, seed):
+    np_aug, torch_aug = _augmentations(name, seed)
+    imgs = _images(seed)
+    expected = np_aug.do_augmentation(imgs.copy())
+    actual = torch_aug.do_augmentation(torch.from_numpy(imgs.copy()))
+    np.testing.assert_array_equal(actual.numpy(), expected)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_rand_crop_matches_numpy(seed):
+    np_aug, torch_aug = _augmentations("Rand_Crop", seed)
+    imgs = _images(seed)
+    expected = np_aug.do_augmentation(imgs)
+    actual = torch_aug.do_augmentation(torch.from_numpy(imgs).float())
+    assert actual.shape == expected.shape == (BATCH_SIZE, 64, 64, 3)
+    np.testing.assert_allclose(actual.numpy(), expected, rtol=0, atol=1e-3)
+
+
+@pytest.mark.parametrize("name", ["Cutout", "Cutout_Color", "Rand_Flip", "Rand_Rotate", "RandGray"])
+def test_out_matches_returned(name):
+    _, torch_aug = _augmentations(name, 0)
+    imgs = torch.from_numpy(_images(0))
+    out = torch.empty_like(imgs)
+    expected = torch_aug.do_augmentation(imgs.clone())
+    assert torch_aug.do_augmentation(imgs, out=out) is out
+    assert torch.equal(out, expected)
+
+
+@pytest.mark.parametrize("name", ["Cutout", "Cutout_Color"])
+def test_numpy_cutout_matches_loop(name):
+    # the vectorized NumPy cutouts against the per-image loop they replaced
+    np_aug, _ = _augmentations(name, 0)
+    imgs = _images(0)
+    expected = imgs.copy()
+    for i, (w1, h1) in enumerate(zip(np_aug.w1, np_aug.h1)):
+        box = expected[i, np_aug.pivot_h + h1:np_aug.pivot_h + 2 * h1, np_aug.pivot_w + w1:np_aug.pivot_w + 2 * w1]
+        box[:] = np_aug.rand_box[i] if name == "Cutout_Color" else 0
+    np.testing.assert_array_equal(np_aug.do_augmentation(imgs), expected)
+    assert np_aug.do_augmentation(imgs[:0]).shape == (0, 64, 64, 3)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_color_jitter_matches_numpy(seed):
+    torch.manual_seed(seed)
+    np_aug = data_augs_procgen.ColorJitterLayer(BATCH_SIZE)
+    torch_aug = data_augs_procgen_torch.ColorJitterLayer(BATCH_SIZE)
+    for factor in ("factor_contrast", "factor_hue", "factor_brightness", "factor_saturate"):
+        setattr(torch_aug, factor, getattr(np_aug, factor).clone())
+    imgs = _images(seed)
+    # the images to transform and the transform order are drawn from np.random and random
+    np.random.seed(seed)
+    random.seed(seed)
+    expected = np_aug.do_augmentation(imgs)
+    np.random.seed(seed)
+    random.seed(seed)
+    actual = torch_aug.do_augmentation(torch.from_numpy(imgs))
+    np.testing.assert_allclose(actual.numpy(), expected, rtol=0, atol=1e-3)
+
+
+def test_center_crop_matches_numpy():
+    imgs = _images(0, shape=(BATCH_SIZE, 84, 84, 3))
+    expected = data_augs_procgen.Center_Crop().do_augmentation(imgs)
+    actual = data_augs_procgen_torch.Center_Crop().do_augmentation(torch.from_numpy(imgs))
+    assert actual.shape == (BATCH_SIZE, 64, 64, 3)
+    np.testing.assert_array_equal(actual.numpy(), expected)
+
+
+def test_gray_matches_numpy_on_ties():
+    # the pixels whose weighted sum is an integer, where float64 rounding decides
+    r, g, b = np.meshgrid(np.arange(256), np.arange(256), np.arange(256), indexing="ij")
+    ties = (2989 * r + 5870 * g + 1140 * b) % 10000 == 0
+    pixels = np.stack([r[ties], g[ties], b[ties]], axis=-1).astype(np.uint8)
+    imgs = pixels.reshape(1, 1, -1, 3)
+    expected = data_augs_procgen.RandGray(1).grayscale(imgs)
+    actual = data_augs_procgen_torch.RandGray(1).grayscale(torch.from_numpy(imgs))
+    np.testing.assert_array_equal(actual.numpy(), expected)
+    # the int32 weighting used off the CPU
+    actual = data_augs_procgen_torch._integer_gray(torch.from_numpy(imgs))
+    np.testing.assert_array_equal(actual.numpy(), expected[..., 0])
+
+
+@pytest.mark.parametrize("name", ["Cutout", "Cutout_Color"])
+def test_window_fill_matches_index_fill(name):
+    # the masked window used off the CPU against the CPU index path
+    _, torch_aug = _augmentations(name, 0)
+    values = torch_aug.rand_box[:, 0, 0] if name == "Cutout_Color" else 0
+    imgs = torch.from_numpy(_images(0))
+    expected = data_augs_procgen_torch._fill_boxes_index(imgs.clone(), torch_aug.h1, torch_aug.w1,
+                                                         torch_aug.pivot_h, torch_aug.pivot_w, values)
+    actual = data_augs_procgen_torch._fill_boxes_window(imgs.clone(), torch_aug.h1, torch_aug.w1, torch_aug.pivot_h,
+                                                        torch_aug.pivot_w, torch_aug.box_max, values)
+    assert torch.equal(actual, expected)
+
+
+@pytest.mark.parametrize("selected", [False, True])
+def test_gray_all_or_none_selected(selected):
+    _, torch_aug = _augmentations("RandGray", 0)
+    torch_aug.random_inds[:] = selected
+    imgs = torch.from_numpy(_images(0))
+    gray = torch_aug.do_augmentation(imgs)
+    assert torch.equal(gray, torch_aug.grayscale(imgs) if selected else imgs)
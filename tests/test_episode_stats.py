@@ -0,0 +1,103 @@
+import gym
+import numpy as np
+import pytest
+
+from episode_stats import EpisodeTracker, VectorEpisodeStatistics, episode_statistics, finished_episodes
+
+
+class StaggeredEnvs(gym.vector.VectorEnv):
+    # env i finishes an episode every i + 2 steps, with reward i + 1 per step
+    def __init__(self, num_envs):
+        super(StaggeredEnvs, self).__init__(num_envs, gym.spaces.Box(0, 1, (1,), np.float32), gym.spaces.Discrete(2))
+        self.lengths = np.arange(num_envs) + 2
+        self.t = np.zeros(num_envs, dtype=np.int64)
+
+    def reset_wait(self, timeout=None, seed=None, return_info=False, options=None):
+        self.t[:] = 0
+        return np.zeros((self.num_envs, 1), dtype=np.float32)
+
+    def step_async(self, actions):
+        pass
+
+    def step_wait(self, timeout=None):
+        self.t += 1
+        dones = self.t % self.lengths == 0
+        rewards = np.arange(self.num_envs, dtype=np.float64) + 1
+        return np.zeros((self.num_envs, 1), dtype=np.float32), rewards, dones, [{} for _ in range(self.num_envs)]
+
+
+def make_envs(num_envs=4):
+    envs = VectorEpisodeStatistics(StaggeredEnvs(num_envs))
+    envs.reset()
+    return envs
+
+
+def test_vector_episode_statistics_records_the_done_envs():
+    envs = make_envs()
+    for step in range(1, 13):
+        _, _, dones, infos = envs.step(np.zeros(4))
+        expected = np.flatnonzero(step % (np.arange(4) + 2) == 0)
+        assert envs.finished_envs.tolist() == expected.tolist()
+        assert envs.finished_returns.tolist() == [(i + 1) * (i + 2) for i in expected]
+        assert envs.finished_lengths.tolist() == [i + 2 for i in expected]
+        assert [i for i, info in enumerate(infos) if "episode" in info] == expected.tolist()
+        for i in expected:
+            assert infos[i]["episode"]["r"] == (i + 1) * (i + 2)
+            assert infos[i]["episode"]["l"] == i + 2
+    # 12 steps: 6, 4, 3 and 2 episodes
+    assert envs.episode_count == 15
+    assert len(envs.return_queue) == 15
+    # the accumulators of the envs done at step 12 start over
+    assert envs.episode_returns.tolist() == [0, 0, 0, 2 * 4]
+
+
+def test_vector_episode_statistics_needs_a_vector_env():
+    env = gym.Env()
+    env.observation_space = gym.spaces.Box(0, 1, (1,), np.float32)
+    env.action_space = gym.spaces.Discrete(2)
+    with pytest.raises(AssertionError):
+        VectorEpisodeStatistics(env)
+
+
+def test_episode_statistics_looks_through_the_wrappers():
+    envs = make_envs()
+    wrapped = gym.wrappers.TransformReward(gym.wrappers.NormalizeReward(envs), lambda reward: reward)
+    assert episode_statistics(wrapped) is envs
+    assert episode_statistics(envs) is envs
+    assert episode_statistics(StaggeredEnvs(2)) is None
+    assert episode_statistics(None) is None
+
+
+def test_finished_episodes_arrays_match_the_infos():
+    envs = make_envs()
+    for _ in range(12):
+        _, _, dones, infos = envs.step(np.zeros(4))
+        from_arrays = finished_episodes(dones, infos, envs)
+        from_infos = finished_episodes(dones, infos)
+        for a, b in zip(from_arrays, from_infos):
+            assert a.dtype == b.dtype
+            assert a.tolist() == b.tolist()
+
+
+@pytest.mark.parametrize("with_envs", [False, True])
+def test_episode_tracker_summary(with_envs):
+    envs = make_envs(2)
+    tracker = EpisodeTracker(envs if with_envs else None)
+    assert tracker.summary() == {}
+    for _ in range(6):
+        _, _, dones, infos = envs.step(np.zeros(2))
+        tracker.update(dones, infos)
+    # env 0: three episodes of return 2 and length 2, env 1: two of return 6 and length 3
+    summary = tracker.summary()
+    assert summary == {
+        "episodic_return": 18 / 5, "episodic_return_median": 2.0, "episodic_return_min": 2.0,
+        "episodic_return_max": 6.0, "episodic_length": 12 / 5, "episodic_length_median": 2.0,
+        "episodic_length_min": 2.0, "episodic_length_max": 3.0, "episodes": 5,
+    }
+    # the summary covers the episodes since the previous one
+    assert tracker.summary() == {}
+    envs.step(np.zeros(2))
+    assert tracker.summary() == {}
+    _, _, dones, infos = envs.step(np.zeros(2))
+    tracker.update(dones, infos)
+    assert tracker.summary()["episodes"] == 1
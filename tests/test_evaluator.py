@@ -0,0 +1,94 @@
+import gym
+import numpy as np
+import torch
+
+from episode_stats import VectorEpisodeStatistics
+from evaluator import evaluate
+from rollout_io import RolloutIO
+
+
+class FixedLengthEnvs(gym.vector.VectorEnv):
+    # env i finishes an episode every episode_length steps, offset by
+    # offsets[i]; the reward of a step is the action. Like Procgen, reset
+    # is ignored after the first one
+    def __init__(self, episode_length, offsets):
+        super(FixedLengthEnvs, self).__init__(len(offsets), gym.spaces.Box(0, 1, (2,), np.float32),
+                                              gym.spaces.Discrete(10))
+        self.episode_length = episode_length
+        self.offsets = np.array(offsets)
+        self.t = None
+        self.steps = 0
+
+    def reset_wait(self, timeout=None, seed=None, return_info=False, options=None):
+        if self.t is None:
+            self.t = self.offsets.copy()
+        return np.zeros((self.num_envs, 2), dtype=np.float32)
+
+    def step_async(self, actions):
+        self._actions = np.array(actions, dtype=np.float64)
+
+    def step_wait(self, timeout=None):
+        self.steps += 1
+        self.t += 1
+        dones = self.t % self.episode_length == 0
+        return np.zeros((self.num_envs, 2), dtype=np.float32), self._actions, dones, [{} for _ in range(self.num_envs)]
+
+
+class ConstantAgent(object):
+    # acts with its version, so an episode it played from the first step
+    # returns version * length
+    def __init__(self, num_envs, version=1):
+        self.num_envs = num_envs
+        self.version = version
+
+    def get_action(self, obs, greedy):
+        return torch.full((self.num_envs,), self.version, dtype=torch.int64)
+
+
+def make(episode_length, offsets):
+    envs = FixedLengthEnvs(episode_length, offsets)
+    return envs, VectorEpisodeStatistics(envs), RolloutIO(len(offsets), (2,))
+
+
+def test_reports_episodes_longer_than_num_steps():
+    envs, wrapped, rollout_io = make(300, [0] * 8)
+    agent = ConstantAgent(8)
+    for i in range(6):
+        agent.version = i + 1
+        episodes = evaluate(agent, wrapped, rollout_io, 256, reset=i == 0)
+        assert episodes == [((i + 1) * 300.0, 300)] * 8
+    # the envs were stepped to the end of the episodes and not further
+    assert envs.steps == 6 * 300
+
+
+def test_reports_only_episodes_played_by_the_agent():
+    envs, wrapped, rollout_io = make(10, [0, 3, 5, 9])
+    agent = ConstantAgent(4)
+    total = 0
+    for i in range(5):
+        agent.version = i + 1
+        episodes = evaluate(agent, wrapped, rollout_io, 13, reset=i == 0)
+        total += len(episodes)
+        assert len(episodes) >= 1
+        assert all(episode_return == (i + 1) * episode_length for episode_return, episode_length in episodes)
+        if i > 0:
+            assert all(episode_length == 10 for _, episode_length in episodes)
+    assert total >= 5
+
+
+def test_stops_at_max_steps():
+    envs, wrapped, rollout_io = make(100, [0, 50])
+    # env 1 finishes after 50 steps, env 0 after 100
+    assert evaluate(ConstantAgent(2), wrapped, rollout_io, 10, max_steps=60) == [(50.0, 50)]
+    assert envs.steps == 60
+    envs, wrapped, rollout_io = make(100, [0, 50])
+    assert evaluate(ConstantAgent(2), wrapped, rollout_io, 10, max_steps=40) == []
+    assert envs.steps == 40
+
+
+def test_stops_after_num_episodes():
+    envs, wrapped, rollout_io = make(5, [0, 1, 2, 3])
+    # the first episodes are cut short by the offsets
+    episodes = evaluate(ConstantAgent(4), wrapped, rollout_io, 100, num_episodes=3)
+    assert episodes == [(2.0, 2), (3.0, 3), (4.0, 4)]
+    assert envs.steps == 4
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+import torch
+
+import gae as gae_module
+from gae import compute_advantages
+
+NUM_STEPS, NUM_ENVS = 32, 4
+GAMMA, GAE_LAMBDA = 0.99, 0.95
+
+
+def _reference(rewards, values, dones, next_value, next_done, gae):
+    # the per-step loop of the original PPO scripts
+    num_steps = rewards.shape[0]
+    next_value = next_value.reshape(1, -1)
+    if gae:
+        advantages = torch.zeros_like(rewards)
+        lastgaelam = 0
+        for t in reversed(range(num_steps)):
+            if t == num_steps - 1:
+                nextnonterminal = 1.0 - next_done
+                nextvalues = next_value
+            else:
+                nextnonterminal = 1.0 - dones[t + 1]
+                nextvalues = values[t + 1]
+            delta = rewards[t] + GAMMA * nextvalues * nextnonterminal - values[t]
+            advantages[t] = lastgaelam = delta + GAMMA * GAE_LAMBDA * nextnonterminal * lastgaelam
+        returns = advantages + values
+    else:
+        returns = torch.zeros_like(rewards)
+        for t in reversed(range(num_steps)):
+            if t == num_steps - 1:
+                nextnonterminal = 1.0 - next_done
+                next_return = next_value
+            else:
+                nextnonterminal = 1.0 - dones[t + 1]
+                next_return = returns[t + 1]
+            returns[t] = rewards[t] + GAMMA * nextnonterminal * next_return
+        advantages = returns - values
+    return advantages, returns
+
+
+def _rollout(seed, num_streams=None):
+    # random rewards and values with episodes ending in the middle of the rollout
+    generator = torch.Generator().manual_seed(seed)
+    streams = () if num_streams is None else (num_streams,)
+    rewards = torch.randn(NUM_STEPS, NUM_ENVS, generator=generator)
+    values = torch.randn(streams + (NUM_STEPS, NUM_ENVS), generator=generator)
+    dones = (torch.rand(NUM_STEPS, NUM_ENVS, generator=generator) < 0.1).float()
+    dones[NUM_STEPS // 2, 0] = 1.0
+    next_value = torch.randn(streams + (NUM_ENVS,), generator=generator)
+    next_done = torch.tensor([0.0, 1.0, 0.0, 1.0])
+    return rewards, values, dones, next_value, next_done
+
+
+@pytest.mark.parametrize("gae", [True, False])
+@pytest.mark.parametrize("seed", range(3))
+def test_matches_loop(seed, gae):
+    rollout = _rollout(seed)
+    expected = _reference(*rollout, gae)
+    actual = compute_advantages(*rollout, GAMMA, GAE_LAMBDA, gae)
+    for a, e in zip(actual, expected):
+        torch.testing.assert_close(a, e)
+
+
+@pytest.mark.parametrize("gae", [True, False])
+def test_numpy_matches_loop(gae):
+    rollout = _rollout(0)
+    expected = _reference(*rollout, gae)
+    actual = compute_advantages(*[x.numpy() for x in rollout], GAMMA, GAE_LAMBDA, gae)
+    for a, e in zip(actual, expected):
+        np.testing.assert_allclose(a, e.numpy(), rtol=1e-5, atol=1e-5)
+
+
+@pytest.mark.parametrize("gae", [True, False])
+def test_stacked_streams_match_loop(gae):
+    rewards, values, dones, next_value, next_done = _rollout(0, num_streams=3)
+    advantages, returns = compute_advantages(rewards, values, dones, next_value, next_done, GAMMA, GAE_LAMBDA, gae)
+    assert advantages.shape == returns.shape == values.shape
+    for k in range(3):
+        expected = _reference(rewards, values[k], dones, next_value[k], next_done, gae)
+        torch.testing.assert_close(advantages[k], expected[0])
+        torch.testing.assert_close(returns[k], expected[1])
+
+
+@pytest.mark.parametrize("gae", [True, False])
+def test_torch_loop_matches_numpy_loop(gae):
+    # the loop used for tensors off the CPU, run here on CPU tensors
+    rewards, values, dones, next_value, next_done = _rollout(0, num_streams=2)
+    expected = gae_module._compute_numpy(rewards.numpy(), values.numpy(), dones.numpy(), next_value.numpy(),
+                                         next_done.numpy(), GAMMA, GAE_LAMBDA, gae)
+    actual = gae_module._compute_torch(rewards, values, dones, next_value, next_done, GAMMA, GAE_LAMBDA, gae)
+    for a, e in zip(actual, expected):
+        np.testing.assert_allclose(a.numpy(), e, rtol=1e-5, atol=1e-5)
+
+
+def test_cpu_tensors_return_tensors():
+    advantages, returns = compute_advantages(*_rollout(0), GAMMA, GAE_LAMBDA)
+    assert isinstance(advantages, torch.Tensor) and isinstance(returns, torch.Tensor)
+    assert advantages.dtype == returns.dtype == torch.float32
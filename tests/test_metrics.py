@@ -0,0 +1,118 @@
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+import time
+
+import numpy as np
+import pytest
+
+from metrics import MetricsWriter
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def restore_sigterm_handler():
+    # MetricsWriter installs its own SIGTERM handler in the main thread
+    handler = signal.getsignal(signal.SIGTERM)
+    yield
+    signal.signal(signal.SIGTERM, handler)
+
+
+def read_lines(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def wait_for_lines(path, count, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while len(read_lines(path)) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return read_lines(path)
+
+
+def test_flushes_once_max_buffer_rows_are_pending(tmp_path):
+    path = str(tmp_path / "metrics")
+    writer = MetricsWriter(path, max_buffer=5, flush_interval=3600.0)
+    for step in range(4):
+        writer.add("charts/SPS", step, step)
+    time.sleep(0.1)
+    assert read_lines(path + ".txt") == []
+    writer.add("charts/SPS", 4, 4)
+    assert wait_for_lines(path + ".txt", 5) == [f"charts/SPS {step} {step}" for step in range(5)]
+    writer.close()
+
+
+def test_flushes_every_flush_interval(tmp_path):
+    path = str(tmp_path / "metrics")
+    writer = MetricsWriter(path, max_buffer=1000, flush_interval=0.05)
+    writer.add("losses/value_loss", 0.5, 10)
+    assert wait_for_lines(path + ".txt", 1) == ["losses/value_loss 10 0.5"]
+    writer.add("losses/value_loss", 0.25, 20)
+    assert wait_for_lines(path + ".txt", 2) == ["losses/value_loss 10 0.5", "losses/value_loss 20 0.25"]
+    writer.close()
+
+
+def test_writes_every_format_on_close(tmp_path):
+    path = str(tmp_path / "metrics")
+    rows = [("charts/SPS", 100, 1), ("losses/value_loss", 0.5, 1), ("charts/SPS", 120, 2)]
+    writer = MetricsWriter(path, formats=("txt", "csv", "npz"), flush_interval=3600.0)
+    for attribute, value, step in rows:
+        writer.add(attribute, value, step)
+    writer.close()
+    # a second close does not write the rows again
+    writer.close()
+
+    assert read_lines(path + ".txt") == ["charts/SPS 1 100", "losses/value_loss 1 0.5", "charts/SPS 2 120"]
+    assert read_lines(path + ".csv") == ["attribute,step,value", "charts/SPS,1,100", "losses/value_loss,1,0.5",
+                                         "charts/SPS,2,120"]
+    with np.load(path + ".npz") as npz:
+        assert npz["names"].tolist() == ["charts/SPS", "losses/value_loss"]
+        assert npz["attribute"].tolist() == [0, 1, 0]
+        assert npz["step"].tolist() == [1, 1, 2]
+        assert npz["value"].tolist() == [100.0, 0.5, 120.0]
+
+
+def test_csv_header_is_written_once(tmp_path):
+    path = str(tmp_path / "metrics")
+    for step in range(2):
+        writer = MetricsWriter(path, formats=("csv",), flush_interval=3600.0)
+        writer.add("charts/SPS", 100, step)
+        writer.close()
+    assert read_lines(path + ".csv") == ["attribute,step,value", "charts/SPS,0,100", "charts/SPS,1,100"]
+
+
+@pytest.mark.parametrize("holding_lock", [False, True])
+def test_sigterm_flushes_buffered_rows(tmp_path, holding_lock):
+    # the rows stay buffered until the child is terminated, which may happen
+    # while the main thread is inside add() holding the buffer lock
+    path = str(tmp_path / "metrics")
+    script = textwrap.dedent(f"""
+        import time
+        from metrics import MetricsWriter
+        writer = MetricsWriter({path!r}, formats=("txt", "csv", "npz"), max_buffer=1000, flush_interval=3600.0)
+        for step in range(10):
+            writer.add("charts/SPS", step * 10, step)
+        if {holding_lock}:
+            writer._lock.acquire()
+        print("ready", flush=True)
+        time.sleep(60)
+    """)
+    env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    child = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, env=env, text=True)
+    try:
+        assert child.stdout.readline().strip() == "ready"
+        child.send_signal(signal.SIGTERM)
+        returncode = child.wait(timeout=10)
+    finally:
+        child.kill()
+        child.stdout.close()
+    assert returncode == 128 + signal.SIGTERM
+    assert read_lines(path + ".txt") == [f"charts/SPS {step} {step * 10}" for step in range(10)]
+    assert len(read_lines(path + ".csv")) == 11
+    with np.load(path + ".npz") as npz:
+        assert npz["step"].tolist() == list(range(10))
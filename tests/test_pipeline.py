@@ -0,0 +1,68 @@
+import threading
+import time
+
+import torch
+import torch.nn as nn
+
+from engine.pipeline import Pipeline
+
+
+class CountingLearner(object):
+    # adds 1 to the weights per update, slowly, and records what it was given
+    def __init__(self, agent, delay=0.01):
+        self.agent = agent
+        self.delay = delay
+        self.calls = []
+
+    def learn(self, update, global_step, *batch):
+        time.sleep(self.delay)
+        self.calls.append((update, global_step, [b.clone() for b in batch], threading.get_ident()))
+        with torch.no_grad():
+            self.agent.weight.add_(1.0)
+
+
+def make_pipeline(delay=0.01):
+    agent = nn.Linear(1, 1, bias=False)
+    with torch.no_grad():
+        agent.weight.zero_()
+    learner = CountingLearner(agent, delay)
+    return Pipeline(agent, learner.learn, "cpu"), learner
+
+
+def test_policy_lag_is_at_most_one_update():
+    pipeline, learner = make_pipeline()
+    lags = []
+    for update in range(1, 6):
+        lags.append(pipeline.submit(update, update * 10, [torch.full((2,), float(update))]))
+    pipeline.close()
+    assert lags == [0, 1, 1, 1, 1]
+    assert [call[:2] for call in learner.calls] == [(update, update * 10) for update in range(1, 6)]
+
+
+def test_submit_hands_the_weights_to_the_policy():
+    pipeline, learner = make_pipeline()
+    assert pipeline.policy is not pipeline.agent
+    for update in range(1, 6):
+        pipeline.submit(update, 0, [torch.zeros(2)])
+        # the rollout after submit acts with the weights of the previous update,
+        # even though that update was still running when submit was called
+        assert pipeline.policy.weight.item() == update - 1
+    pipeline.wait()
+    assert pipeline.agent.weight.item() == 5
+    assert pipeline.policy.weight.item() == 4
+    pipeline.submit(6, 0, [torch.zeros(2)])
+    assert pipeline.policy.weight.item() == 5
+    pipeline.close()
+    assert pipeline.agent.weight.item() == 6
+
+
+def test_learner_runs_on_a_copy_of_the_batch():
+    pipeline, learner = make_pipeline(delay=0.05)
+    batch = [torch.arange(4.0)]
+    pipeline.submit(1, 0, batch)
+    # the rollout overwrites its buffers while the learner runs
+    batch[0].fill_(-1.0)
+    pipeline.close()
+    (_, _, learned_batch, thread), = learner.calls
+    assert torch.equal(learned_batch[0], torch.arange(4.0))
+    assert thread != threading.get_ident()
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+envs = pytest.importorskip("dm2gym.envs")
+
+
+@pytest.mark.parametrize("frame_stack", [1, 3])
+@pytest.mark.parametrize("channels_first", [True, False])
+def test_stack_matches_physics_render(frame_stack, channels_first):
+    env = envs.DMSuiteEnv("walker", "walk", from_pixels=True, height=64, width=48, frame_stack=frame_stack,
+                          channels_first=channels_first)
+    env.seed(0)
+
+    def render():
+        return env.env.physics.render(64, 48, camera_id=0)
+
+    observation = env.reset()
+    frames = [render()] * frame_stack
+    # past the end of the ring, so the window is moved to its start a few times
+    for step in range(3 * env.pixels.ring_frames):
+        if step:
+            observation, _, _, _ = env.step(np.full(6, np.sin(step)))
+            frames.append(render())
+        assert observation.shape == env.observation_space.shape
+        assert np.shares_memory(observation, env.pixels._ring)
+        for i, frame in enumerate(frames[-frame_stack:]):
+            if channels_first:
+                assert np.array_equal(observation[3 * i:3 * (i + 1)].transpose(1, 2, 0), frame)
+            else:
+                assert np.array_equal(observation[:, :, 3 * i:3 * (i + 1)], frame)
+    env.close()
+    assert env.pixels is None
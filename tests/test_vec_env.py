@@ -0,0 +1,98 @@
+import gym
+import numpy as np
+import pytest
+
+from vec_env import SubprocVectorEnv
+
+
+class CountingEnv(gym.Env):
+    # observation [env_id, t]; the episodes of env i last i + 2 steps with reward 1 per
+    # step; an action of -1 raises
+    observation_space = gym.spaces.Box(-np.inf, np.inf, (2,), np.float32)
+    action_space = gym.spaces.Box(-1.0, 1.0, (1,), np.float32)
+
+    def __init__(self, env_id):
+        self.env_id = env_id
+        self.t = 0
+
+    def reset(self):
+        self.t = 0
+        return self._observation()
+
+    def step(self, action):
+        if action[0] == -1:
+            raise ValueError(f"env {self.env_id} failed")
+        self.t += 1
+        return self._observation(), 1.0, self.t == self.env_id + 2, {}
+
+    def seed(self, seed=None):
+        return [seed]
+
+    def get_id(self, offset=0):
+        return self.env_id + offset
+
+    def _observation(self):
+        return np.array([self.env_id, self.t], dtype=np.float32)
+
+
+def make_envs(num_envs, num_workers, copy=True):
+    return SubprocVectorEnv([lambda i=i: CountingEnv(i) for i in range(num_envs)], num_workers, copy=copy)
+
+
+@pytest.mark.parametrize("num_envs, num_workers", [(1, 1), (3, 1), (5, 2), (7, 3)])
+def test_workers_step_their_blocks(num_envs, num_workers):
+    envs = make_envs(num_envs, num_workers)
+    try:
+        assert len(envs.processes) == num_workers
+        observations = envs.reset()
+        np.testing.assert_array_equal(observations[:, 0], np.arange(num_envs))
+        np.testing.assert_array_equal(observations[:, 1], 0)
+        observations, rewards, dones, infos = envs.step(np.zeros((num_envs, 1), dtype=np.float32))
+        np.testing.assert_array_equal(observations[:, 0], np.arange(num_envs))
+        np.testing.assert_array_equal(rewards, np.ones(num_envs))
+        assert len(infos) == num_envs
+        assert envs.call("get_id", offset=10) == tuple(range(10, 10 + num_envs))
+    finally:
+        envs.close()
+
+
+def test_auto_reset_keeps_terminal_observation():
+    envs = make_envs(3, 2)
+    try:
+        envs.reset()
+        actions = np.zeros((3, 1), dtype=np.float32)
+        for t in range(1, 5):
+            observations, _, dones, infos = envs.step(actions)
+            for i in range(3):
+                length = i + 2
+                assert dones[i] == (t % length == 0)
+                if dones[i]:
+                    np.testing.assert_array_equal(infos[i]["terminal_observation"], [i, length])
+                    np.testing.assert_array_equal(observations[i], [i, 0])
+                else:
+                    assert "terminal_observation" not in infos[i]
+                    np.testing.assert_array_equal(observations[i], [i, t % length])
+    finally:
+        envs.close()
+
+
+def test_copy_false_returns_the_shared_buffer():
+    envs = make_envs(4, 2, copy=False)
+    try:
+        first = envs.reset()
+        second, _, _, _ = envs.step(np.zeros((4, 1), dtype=np.float32))
+        assert first is second is envs.observations
+        np.testing.assert_array_equal(second[:, 1], 1)
+    finally:
+        envs.close()
+
+
+def test_failing_worker_raises():
+    envs = make_envs(4, 2)
+    envs.reset()
+    actions = np.zeros((4, 1), dtype=np.float32)
+    actions[3] = -1
+    with pytest.raises(RuntimeError, match="env 3 failed"):
+        envs.step(actions)
+    assert envs.closed
+    assert not any(process.is_alive() for process in envs.processes)
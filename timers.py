@@ -0,0 +1,105 @@
+import functools
+import threading
+import time
+from contextlib import nullcontext
+
+import torch
+
+_NULL_PHASE = nullcontext()
+
+
+class _Phase(object):
+    __slots__ = ("timer", "name", "path", "start", "label")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+        self.label = torch.profiler.record_function(name) if timer.labels else None
+
+    def __enter__(self):
+        stack = self.timer._stack()
+        self.path = stack[-1] + "/" + self.name if stack else self.name
+        stack.append(self.path)
+        if self.label is not None:
+            self.label.__enter__()
+        self.timer._sync()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer._sync()
+        self.timer._add(self.path, time.perf_counter() - self.start)
+        self.timer._stack().pop()
+        if self.label is not None:
+            self.label.__exit__(*exc_info)
+        return False
+
+
+class PhaseTimer(object):
+    """Wall-clock time per phase of the training loop.
+
+    `with timer("env_step"):` times a phase; phases nest and a nested phase
+    is recorded as "outer/inner". wrap(name, fn) returns fn timed as a phase.
+    When disabled, timer(name) returns a shared no-op context manager and
+    wrap() returns fn itself, so the instrumentation costs nothing. On CUDA
+    the current stream is synchronized at the phase boundaries, which charges
+    the queued kernels to the phase that launched them but removes some
+    overlap; the pipelined rollout and learner run on different streams and
+    do not wait for each other's kernels.
+    summary(num_samples) returns the seconds, the share of the wall-clock
+    time and the samples per second of every phase since the last summary.
+    In the pipelined mode the learner phases overlap the rollout, so the
+    shares can add up to more than 1. With labels the phases are also
+    marked as torch.profiler.record_function ranges, for UpdateProfiler.
+    """
+    def __init__(self, enabled=False, device="cpu", labels=False):
+        self.enabled = enabled
+        self.labels = labels
+        self.device = torch.device(device)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._totals = {}
+        self._start = time.perf_counter()
+
+    def __call__(self, name):
+        if self.enabled:
+            return _Phase(self, name)
+        if self.labels:
+            return torch.profiler.record_function(name)
+        return _NULL_PHASE
+
+    def wrap(self, name, fn):
+        if not self.enabled and not self.labels:
+            return fn
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            with self(name):
+                return fn(*args, **kwargs)
+        return timed
+
+    def summary(self, num_samples):
+        now = time.perf_counter()
+        elapsed, self._start = now - self._start, now
+        with self._lock:
+            totals, self._totals = self._totals, {}
+        summary = {}
+        for path, seconds in totals.items():
+            summary[path + "/seconds"] = seconds
+            summary[path + "/share"] = seconds / elapsed
+            summary[path + "/sps"] = num_samples / seconds if seconds > 0 else 0.0
+        return summary
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _sync(self):
+        if self.device.type == "cuda":
+            torch.cuda.current_stream(self.device).synchronize()
+
+    def _add(self, path, seconds):
+        with self._lock:
+            self._totals[path] = self._totals.get(path, 0.0) + seconds
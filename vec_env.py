@@ -0,0 +1,181 @@
+import multiprocessing as mp
+import os
+import sys
+
+import numpy as np
+from gym.vector import VectorEnv
+from gym.vector.utils import (CloudpickleWrapper, clear_mpi_env_vars, create_shared_memory, iterate,
+                              read_from_shared_memory, write_to_shared_memory)
+
+
+def _worker(env_fns, start, pipe, parent_pipe, shared_memory, observation_space):
+    # runs a contiguous block of the envs; observations go to shared memory at
+    # [start, start + len(envs)), everything else goes back through the pipe
+    parent_pipe.close()
+    envs = []
+    try:
+        envs = [env_fn() for env_fn in env_fns.fn]
+        while True:
+            command, data = pipe.recv()
+            if command == "reset":
+                for i, (env, kwargs) in enumerate(zip(envs, data)):
+                    observation = env.reset(**kwargs)
+                    write_to_shared_memory(observation_space, start + i, observation, shared_memory)
+                pipe.send((None, True))
+            elif command == "step":
+                rewards = np.zeros(len(envs), dtype=np.float64)
+                dones = np.zeros(len(envs), dtype=np.bool_)
+                infos = []
+                for i, (env, action) in enumerate(zip(envs, data)):
+                    observation, rewards[i], dones[i], info = env.step(action)
+                    if dones[i]:
+                        info["terminal_observation"] = observation
+                        observation = env.reset()
+                    write_to_shared_memory(observation_space, start + i, observation, shared_memory)
+                    infos.append(info)
+                pipe.send(((rewards, dones, infos), True))
+            elif command == "seed":
+                for env, seed in zip(envs, data):
+                    env.seed(seed)
+                pipe.send((None, True))
+            elif command == "_call":
+                name, args, kwargs = data
+                results = []
+                for env in envs:
+                    function = getattr(env, name)
+                    results.append(function(*args, **kwargs) if callable(function) else function)
+                pipe.send((results, True))
+            elif command == "close":
+                pipe.send((None, True))
+                break
+            else:
+                raise RuntimeError(f"Received unknown command `{command}`.")
+    except (KeyboardInterrupt, Exception):
+        pipe.send(("{}: {}".format(*sys.exc_info()[:2]), False))
+    finally:
+        for env in envs:
+            env.close()
+
+
+class SubprocVectorEnv(VectorEnv):
+    """Steps the envs in a pool of worker processes.
+
+    Unlike gym.vector.AsyncVectorEnv, a worker can host several envs: the
+    num_envs env_fns are split into num_workers contiguous blocks and every
+    reset/step is a single command per worker for its whole block.
+    Observations are written into a shared-memory array, only rewards, dones
+    and infos go through the pipes. Envs are reset automatically when done,
+    with the last observation in info["terminal_observation"], as in
+    SyncVectorEnv. num_workers defaults to min(num_envs, os.cpu_count()).
+    """
+    def __init__(self, env_fns, num_workers=None, copy=True, context=None):
+        dummy_env = env_fns[0]()
+        observation_space = dummy_env.observation_space
+        action_space = dummy_env.action_space
+        self.metadata = dummy_env.metadata
+        dummy_env.close()
+        del dummy_env
+        super(SubprocVectorEnv, self).__init__(len(env_fns), observation_space, action_space)
+
+        num_workers = num_workers or min(self.num_envs, os.cpu_count())
+        num_workers = max(1, min(num_workers, self.num_envs))
+        self.copy = copy
+        ctx = mp.get_context(context)
+        self._shared_memory = create_shared_memory(self.single_observation_space, n=self.num_envs, ctx=ctx)
+        self.observations = read_from_shared_memory(self.single_observation_space, self._shared_memory,
+                                                    n=self.num_envs)
+        self._bounds = np.linspace(0, self.num_envs, num_workers + 1).astype(int)
+        self.parent_pipes, self.processes = [], []
+        with clear_mpi_env_vars():
+            for start, end in zip(self._bounds[:-1], self._bounds[1:]):
+                parent_pipe, child_pipe = ctx.Pipe()
+                process = ctx.Process(
+                    target=_worker,
+                    name=f"Worker<{type(self).__name__}>-{start}:{end}",
+                    args=(CloudpickleWrapper(env_fns[start:end]), start, child_pipe, parent_pipe,
+                          self._shared_memory, self.single_observation_space),
+                )
+                process.daemon = True
+                process.start()
+                child_pipe.close()
+                self.parent_pipes.append(parent_pipe)
+                self.processes.append(process)
+        self._actions = None
+
+    def _split(self, values):
+        return [values[start:end] for start, end in zip(self._bounds[:-1], self._bounds[1:])]
+
+    def _send(self, command, per_env_data):
+        for pipe, data in zip(self.parent_pipes, self._split(per_env_data)):
+            pipe.send((command, data))
+
+    def _receive(self):
+        results, errors = [], []
+        for pipe in self.parent_pipes:
+            result, success = pipe.recv()
+            if success:
+                results.append(result)
+            else:
+                errors.append(result)
+        if errors:
+            self.close(terminate=True)
+            raise RuntimeError("Environment worker failed: " + "; ".join(errors))
+        return results
+
+    def _observations(self):
+        return np.copy(self.observations) if self.copy else self.observations
+
+    def seed(self, seed=None):
+        super(SubprocVectorEnv, self).seed(seed=seed)
+        if seed is None or isinstance(seed, int):
+            seed = [None if seed is None else seed + i for i in range(self.num_envs)]
+        assert len(seed) == self.num_envs
+        self._send("seed", seed)
+        self._receive()
+
+    def reset_async(self, seed=None, return_info=False, options=None):
+        assert not return_info, "return_info is not supported"
+        if seed is None or isinstance(seed, int):
+            seed = [None if seed is None else seed + i for i in range(self.num_envs)]
+        kwargs = []
+        for single_seed in seed:
+            single_kwargs = {}
+            if single_seed is not None:
+                single_kwargs["seed"] = single_seed
+            if options is not None:
+                single_kwargs["options"] = options
+            kwargs.append(single_kwargs)
+        self._send("reset", kwargs)
+
+    def reset_wait(self, timeout=None, seed=None, return_info=False, options=None):
+        self._receive()
+        return self._observations()
+
+    def step_async(self, actions):
+        self._actions = list(iterate(self.action_space, actions))
+        self._send("step", self._actions)
+
+    def step_wait(self, timeout=None):
+        rewards, dones, infos = zip(*self._receive())
+        return self._observations(), np.concatenate(rewards), np.concatenate(dones), sum(infos, [])
+
+    def call(self, name, *args, **kwargs):
+        for pipe in self.parent_pipes:
+            pipe.send(("_call", (name, args, kwargs)))
+        return tuple(sum(self._receive(), []))
+
+    def close_extras(self, timeout=None, terminate=False):
+        if not terminate:
+            for pipe in self.parent_pipes:
+                if not pipe.closed:
+                    try:
+                        pipe.send(("close", None))
+                        pipe.recv()
+                    except (BrokenPipeError, EOFError):
+                        pass
+        for process in self.processes:
+            if terminate and process.is_alive():
+                process.terminate()
+            process.join()
+        for pipe in self.parent_pipes:
+            pipe.close()